@@ -1,19 +1,43 @@
 import random
 import time
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NARRATIVE_VARIANTS = 4  # Distinct cached narrations per room and difficulty
+
+AI_CHATS = (
+    "I'm looking for something...",
+    "Did you see that?",
+    "It's quiet here...",
+    "What's going on?",
+    "I sense something nearby..."
+)
+
+
 class AIEngine:
     def __init__(self):
         self.last_event_time = {}
+        self.narrator = None  # NarrativeService; plain templates when None
+        self.pool = None  # NarrativePool of pre-generated narration for story sessions
+        # world_interval/player_interval: seconds between AI event and AI player ticks
         self.difficulty_settings = {
-            "easy": {"frequency": 10, "intensity": 1},
-            "normal": {"frequency": 5, "intensity": 2},
-            "hard": {"frequency": 2, "intensity": 3}
+            "easy": {"frequency": 10, "intensity": 1, "world_interval": 15, "player_interval": 12},
+            "normal": {"frequency": 5, "intensity": 2, "world_interval": 10, "player_interval": 8},
+            "hard": {"frequency": 2, "intensity": 3, "world_interval": 6, "player_interval": 5}
         }
     
-    def generate_events(self, players, map_obj, difficulty="normal"):
-        """Generate AI events based on difficulty"""
+    def settings_for(self, difficulty):
+        """Difficulty settings, defaulting to normal"""
+        return self.difficulty_settings.get(difficulty, self.difficulty_settings["normal"])
+    
+    def generate_events(self, players, map_obj, difficulty="normal", genre="mystery", story=False):
+        """Generate AI events based on difficulty; story sessions also get a
+        narrative beat for each human character"""
         messages = []
-        settings = self.difficulty_settings.get(difficulty, self.difficulty_settings["normal"])
+        settings = self.settings_for(difficulty)
         
         # Only generate events at the frequency interval
         if random.randint(0, 10) > settings["frequency"]:
@@ -23,24 +47,18 @@ class AIEngine:
         
         # Room-specific events
         for _ in range(settings["intensity"]):
-            room = random.choice(rooms)
-            room_name = room.name if hasattr(room, "name") else str(room)
-            
-            event_templates = [
-                f"A mysterious sound echoes through {room_name}...",
-                f"Shadows flicker in {room_name}.",
-                f"Something moves in {room_name}!",
-                f"You hear footsteps in {room_name}.",
-                f"The air grows cold in {room_name}.",
-            ]
-            
-            if difficulty == "hard":
-                event_templates.extend([
-                    f"DANGER: Something malevolent appears in {room_name}!",
-                    f"An alarm triggers in {room_name}!",
-                ])
-            
-            text = random.choice(event_templates)
+            pooled = self.pool.draw("room_event") if self.pool is not None else None
+            if pooled is not None and pooled[0] in map_obj.rooms:
+                room_name, text = pooled
+            elif self.narrator is not None:
+                room_name = random.choice(rooms).name
+                # Cached narration, or a template while the provider catches up
+                text = self.narrator.narrate_nowait(
+                    "room_event", genre, room_name, difficulty, context=str(random.randrange(NARRATIVE_VARIANTS))
+                )
+            else:
+                room_name = random.choice(rooms).name
+                text = random.choice(room_event_templates(room_name, difficulty))
             
             messages.append({
                 "type": "ai_event",
@@ -51,14 +69,117 @@ class AIEngine:
                 "timestamp": time.time()
             })
         
+        if story:
+            for character in players.values():
+                if character.is_ai:
+                    continue
+                messages.append({
+                    "type": "narrative",
+                    "room": character.current_room,
+                    "player": character.name,
+                    "text": self.generate_narrative_event(character, difficulty, genre),
+                    "visibility": "whisper",  # Only the character's player sees their beat
+                    "timestamp": time.time()
+                })
+        
         return messages
     
-    def generate_narrative_event(self, players, character):
-        """Generate story-mode narrative event for a character"""
-        templates = [
-            f"{character.name} recalls a distant memory...",
-            f"{character.name} notices something unusual.",
-            f"A stranger approaches {character.name}.",
-            f"{character.name}'s past catches up with them...",
-        ]
-        return random.choice(templates)
+    def generate_narrative_event(self, character, difficulty="normal", genre="mystery"):
+        """Story-mode narrative beat for a character: pre-generated, cached
+        narration, or a template while the provider catches up"""
+        pooled = self.pool.draw("narrative") if self.pool is not None else None
+        if pooled is not None:
+            return pooled
+        if self.narrator is not None:
+            return self.narrator.narrate_nowait(
+                "narrative", genre, character.current_room, difficulty, context=character.name, subject=character.name
+            )
+        return random.choice(narrative_templates(character.name, difficulty))
+
+
+def room_event_templates(room_name, difficulty="normal"):
+    """Template texts for an AI event in a room"""
+    event_templates = [
+        f"A mysterious sound echoes through {room_name}...",
+        f"Shadows flicker in {room_name}.",
+        f"Something moves in {room_name}!",
+        f"You hear footsteps in {room_name}.",
+        f"The air grows cold in {room_name}.",
+    ]
+    
+    if difficulty == "hard":
+        event_templates.extend([
+            f"DANGER: Something malevolent appears in {room_name}!",
+            f"An alarm triggers in {room_name}!",
+        ])
+    return event_templates
+
+
+def narrative_templates(name, difficulty="normal"):
+    """Template texts for a story-mode narrative beat about a character"""
+    templates = [
+        f"{name} recalls a distant memory...",
+        f"{name} notices something unusual.",
+        f"A stranger approaches {name}.",
+        f"{name}'s past catches up with them...",
+    ]
+    
+    if difficulty == "easy":
+        templates.append("Time seems to move slowly here...")
+    elif difficulty == "hard":
+        templates.extend([
+            f"{name}'s actions have serious consequences.",
+            f"A shocking twist upends everything {name} believed.",
+            "The stakes have never felt higher...",
+        ])
+    return templates
+
+
+class BatchAIController:
+    """Decides moves and chats for a whole batch of AI players in one pass.
+
+    Works on room ids and the map's CSR adjacency: every bot rolls its move,
+    chat and choice of neighbor at once (with a NumPy Generator when NumPy is
+    installed, one random.Random draw per roll otherwise).
+    """
+    
+    def __init__(self, graph, move_chance=0.3, chat_chance=0.2, seed=None):
+        self.graph = graph
+        self.move_chance = move_chance
+        self.chat_chance = chat_chance
+        if np is not None:
+            self.rng = np.random.default_rng(seed)
+            self.offsets = np.frombuffer(graph.offsets, dtype=np.int32)
+            self.neighbors = np.frombuffer(graph.neighbors, dtype=np.int32)
+            self.degrees = np.diff(self.offsets)
+        else:
+            self.rng = random.Random(seed)
+    
+    def decide(self, room_ids):
+        """For bots in room_ids (by position), return (moves, chats): lists of
+        (index, target room id) and (index, AI_CHATS index)"""
+        if not room_ids:
+            return [], []
+        if np is None:
+            return self._decide_python(room_ids)
+        rooms = np.asarray(room_ids, dtype=np.int32)
+        rolls = self.rng.random((3, len(rooms)))
+        degrees = self.degrees[rooms]
+        moving = np.flatnonzero((rolls[0] < self.move_chance) & (degrees > 0))
+        picks = (rolls[1][moving] * degrees[moving]).astype(np.int32)
+        targets = self.neighbors[self.offsets[rooms[moving]] + picks]
+        chatting = np.flatnonzero(rolls[2] < self.chat_chance)
+        lines = self.rng.integers(0, len(AI_CHATS), len(chatting))
+        return list(zip(moving.tolist(), targets.tolist())), list(zip(chatting.tolist(), lines.tolist()))
+    
+    def _decide_python(self, room_ids):
+        rng = self.rng
+        moves, chats = [], []
+        for index, room_id in enumerate(room_ids):
+            if rng.random() < self.move_chance:
+                neighbors = self.graph.neighbor_ids(room_id)
+                if neighbors:
+                    moves.append((index, rng.choice(neighbors)))
+            if rng.random() < self.chat_chance:
+                chats.append((index, rng.randrange(len(AI_CHATS))))
+        return moves, chats
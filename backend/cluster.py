@@ -0,0 +1,397 @@
+"""Multi-worker deployment: sessions are pinned to workers by consistent hashing
+of their room_code and workers talk over a local message bus.
+
+Run with:  python -m backend.cluster --workers 4 --port 8001
+
+Each worker accepts websockets on the shared port. A client whose session lives
+on another worker is relayed: its actions are forwarded to the owning worker and
+the frames the owner's fan-out produces for it come back over the bus.
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+from backend.encoding import encode_json
+from backend.fanout import FanOut
+from backend.sessions import DEFAULT_SESSION
+
+FRAME_HEADER = struct.Struct(">I")  # Length prefix for bus messages
+CALL_TIMEOUT = 5.0  # Default seconds to wait for another worker to answer a call
+
+
+class WorkerUnavailable(Exception):
+    """Another worker could not be reached over the bus"""
+
+
+class WorkerTimeout(WorkerUnavailable):
+    """Another worker did not answer a call in time"""
+
+
+class RemoteError(RuntimeError):
+    """A call failed on the other worker; status_code is the HTTP status its
+    exception asked for (e.g. 404 for an unknown session), if any"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class HashRing:
+    """Consistent hash ring mapping keys (room codes) to worker ids"""
+
+    def __init__(self, nodes, replicas=64):
+        self.ring = []
+        for node in nodes:
+            for replica in range(replicas):
+                self.ring.append((self._hash(f"{node}:{replica}"), node))
+        self.ring.sort()
+        self.hashes = [h for h, _ in self.ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key):
+        """Worker id that owns key"""
+        index = bisect.bisect(self.hashes, self._hash(key)) % len(self.ring)
+        return self.ring[index][1]
+
+
+class Bus:
+    """Point-to-point message bus between workers. Messages are JSON-able dicts."""
+
+    async def start(self, handler):
+        """Start receiving; handler(message) is awaited for each incoming message"""
+        raise NotImplementedError
+
+    async def send(self, worker_id, message):
+        """Deliver message to worker_id"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class UnixSocketBus(Bus):
+    """Bus over Unix domain sockets: one listening socket per worker in socket_dir,
+    length-prefixed JSON frames, one lazily opened connection per peer"""
+
+    def __init__(self, worker_id, socket_dir, connect_timeout=10.0):
+        self.worker_id = worker_id
+        self.socket_dir = Path(socket_dir)
+        self.connect_timeout = connect_timeout
+        self.server = None
+        self.handler = None
+        self.peers = {}  # worker_id -> StreamWriter
+        self.locks = {}
+
+    def path_for(self, worker_id):
+        return str(self.socket_dir / f"worker-{worker_id}.sock")
+
+    async def start(self, handler):
+        self.handler = handler
+        self.socket_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(self.worker_id)
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = await asyncio.start_unix_server(self._serve, path=path)
+        print(f"[BUS] Worker {self.worker_id} listening on {path}")
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+                try:
+                    await self.handler(json.loads(payload))
+                except Exception as e:
+                    print(f"[BUS] Error handling message: {type(e).__name__}: {e}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _writer_for(self, worker_id):
+        writer = self.peers.get(worker_id)
+        if writer is not None and not writer.is_closing():
+            return writer
+        lock = self.locks.setdefault(worker_id, asyncio.Lock())
+        async with lock:
+            writer = self.peers.get(worker_id)
+            if writer is not None and not writer.is_closing():
+                return writer
+            # Peers start at roughly the same time; retry until the socket exists
+            deadline = asyncio.get_running_loop().time() + self.connect_timeout
+            while True:
+                try:
+                    _, writer = await asyncio.open_unix_connection(self.path_for(worker_id))
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if asyncio.get_running_loop().time() > deadline:
+                        raise
+                    await asyncio.sleep(0.1)
+            self.peers[worker_id] = writer
+            return writer
+
+    async def send(self, worker_id, message):
+        if worker_id == self.worker_id:
+            await self.handler(message)
+            return
+        payload = encode_json(message).encode("utf-8")
+        writer = await self._writer_for(worker_id)
+        writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+        await writer.drain()
+
+    async def close(self):
+        for writer in self.peers.values():
+            writer.close()
+        if self.server:
+            self.server.close()
+
+
+class RemoteSocket:
+    """Stands in for the websocket of a player connected to another worker.
+    The owning worker's fan-out writes to it; frames travel back over the bus."""
+
+    def __init__(self, router, origin, conn_id):
+        self.router = router
+        self.origin = origin
+        self.conn_id = conn_id
+
+    async def send_text(self, frame):
+        await self.router.bus.send(self.origin, {"op": "frame", "conn": self.conn_id, "text": frame})
+
+    async def send_json(self, data):
+        await self.send_text(encode_json(data))
+
+    async def close(self):
+        await self.router.bus.send(self.origin, {"op": "close", "conn": self.conn_id})
+
+
+class ClusterRouter:
+    """Routes websocket sessions to the worker that owns their room_code"""
+
+    def __init__(self, sessions, bus, worker_id, worker_count):
+        self.sessions = sessions
+        self.bus = bus
+        self.worker_id = worker_id
+        self.ring = HashRing(range(worker_count))
+        self.conn_ids = itertools.count(1)
+        self.relayed = FanOut(on_close=self._relay_closed)  # Local sockets of relayed clients
+        self.relayed_sockets = {}  # conn id -> websocket (origin side)
+        self.remote_players = {}  # (origin, conn id) -> (engine, player) (owner side)
+        self.joining = {}  # (origin, conn id) -> bus messages queued while the join runs (owner side)
+        self.tasks = set()  # Joins and calls running outside the bus read loop
+        self.calls = {}  # call id -> Future
+        self.methods = {}  # name -> async handler(**args), callable by other workers (see backend.main)
+
+    @classmethod
+    def from_env(cls, sessions):
+        """Build a router from ISG_WORKER_ID/ISG_WORKER_COUNT/ISG_BUS_DIR, or None
+        when running as a single process"""
+        worker_count = int(os.environ.get("ISG_WORKER_COUNT", "1"))
+        if worker_count <= 1:
+            return None
+        worker_id = int(os.environ["ISG_WORKER_ID"])
+        bus = UnixSocketBus(worker_id, os.environ.get("ISG_BUS_DIR", tempfile.gettempdir()))
+        return cls(sessions, bus, worker_id, worker_count)
+
+    async def start(self):
+        await self.bus.start(self.dispatch)
+
+    def owner(self, room_code):
+        return self.ring.node_for(room_code or DEFAULT_SESSION)
+
+    def is_local(self, room_code):
+        return self.owner(room_code) == self.worker_id
+
+    # Origin side: the worker holding the client's real websocket
+
+    async def relay(self, websocket, player_id, room_code, params):
+        """Forward a client's traffic to the owning worker until it disconnects"""
+        owner = self.owner(room_code)
+        conn_id = f"{self.worker_id}:{next(self.conn_ids)}"
+        self.relayed_sockets[conn_id] = websocket
+        self.relayed.register(conn_id, websocket)
+        print(f"[CLUSTER] Relaying {player_id} ({room_code}) to worker {owner}")
+        try:
+            await self.bus.send(owner, {
+                "op": "join", "origin": self.worker_id, "conn": conn_id,
+                "player_id": player_id, "room_code": room_code, "since": params.get("since")
+            })
+            while True:
+                data = await websocket.receive_json()
+                await self.bus.send(owner, {"op": "action", "origin": self.worker_id, "conn": conn_id, "data": data})
+        except Exception as e:
+            print(f"[CLUSTER] {player_id} relay ended: {type(e).__name__}")
+        finally:
+            self.relayed_sockets.pop(conn_id, None)
+            self.relayed.unregister(conn_id, websocket)
+            try:
+                await self.bus.send(owner, {"op": "leave", "origin": self.worker_id, "conn": conn_id})
+            except Exception:
+                pass
+
+    def _relay_closed(self, conn_id, websocket):
+        self.relayed_sockets.pop(conn_id, None)
+        asyncio.get_running_loop().create_task(self._close(websocket))
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    # Owner side: the worker hosting the session
+
+    async def dispatch(self, message):
+        """Handle one bus message. Joins and calls can take long (a session may
+        replay its journal, a PDF may render), so they run in their own tasks
+        and the bus read loop keeps draining."""
+        op = message.get("op")
+        if op == "frame":
+            self.relayed.send_frame(message["conn"], message["text"])
+        elif op == "close":
+            websocket = self.relayed_sockets.pop(message["conn"], None)
+            if websocket is not None:
+                self.relayed.unregister(message["conn"], websocket)
+                await self._close(websocket)
+        elif op == "join":
+            self.joining[(message["origin"], message["conn"])] = []
+            self._spawn(self._join(message))
+        elif op in ("action", "leave"):
+            key = (message["origin"], message["conn"])
+            if key in self.joining:
+                self.joining[key].append(message)  # Handled in order once the join is done
+            else:
+                await self._handle(key, message)
+        elif op == "call":
+            self._spawn(self._call(message))
+        elif op == "reply":
+            future = self.calls.pop(message["id"], None)
+            if future is not None and not future.done():
+                if "error" in message:
+                    future.set_exception(RemoteError(message["error"], message.get("status")))
+                else:
+                    future.set_result(message.get("result"))
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _join(self, message):
+        key = (message["origin"], message["conn"])
+        try:
+            engine = await self.sessions.get_or_create(message.get("room_code"))
+            socket = RemoteSocket(self, message["origin"], message["conn"])
+            player = await engine.join(socket, message["player_id"], room_code=message.get("room_code"), since=message.get("since"))
+            self.remote_players[key] = (engine, player)
+            queued = self.joining[key]
+            while queued:  # More may be queued while these are handled
+                await self._handle(key, queued.pop(0))
+        except Exception as e:
+            print(f"[CLUSTER] Join of {message.get('player_id')} failed: {type(e).__name__}: {e}")
+            await self.bus.send(message["origin"], {"op": "close", "conn": message["conn"]})
+        finally:
+            self.joining.pop(key, None)
+
+    async def _handle(self, key, message):
+        """Apply a relayed client's action or leave"""
+        if message["op"] == "action":
+            entry = self.remote_players.get(key)
+            if entry:
+                engine, player = entry
+                await engine.handle_action(player, message["data"])
+        else:
+            entry = self.remote_players.pop(key, None)
+            if entry:
+                engine, player = entry
+                engine.remove_player(player)
+
+    async def _call(self, message):
+        try:
+            result = await self.methods[message["method"]](**message.get("args", {}))
+            reply = {"op": "reply", "id": message["id"], "result": result}
+        except Exception as e:
+            status_code = getattr(e, "status_code", None)
+            reply = {"op": "reply", "id": message["id"], "status": status_code,
+                     "error": str(e) if status_code else f"{type(e).__name__}: {e}"}
+        try:
+            await self.bus.send(message["origin"], reply)
+        except Exception as e:
+            print(f"[CLUSTER] Reply to worker {message['origin']} failed: {type(e).__name__}: {e}")
+
+    async def call(self, worker_id, method, timeout=CALL_TIMEOUT, **args):
+        """Run a registered method on another worker and return its result.
+        Raises WorkerTimeout if it does not answer within timeout seconds and
+        WorkerUnavailable if it cannot be reached."""
+        call_id = f"{self.worker_id}:{next(self.conn_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self.calls[call_id] = future
+        try:
+            try:
+                await self.bus.send(worker_id, {"op": "call", "id": call_id, "origin": self.worker_id, "method": method, "args": args})
+            except (OSError, ConnectionError) as e:
+                raise WorkerUnavailable(f"worker {worker_id} is unreachable ({type(e).__name__})") from e
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise WorkerTimeout(f"worker {worker_id} did not answer {method} within {timeout:g}s") from None
+        finally:
+            self.calls.pop(call_id, None)
+
+
+def _run_worker(worker_id, worker_count, bus_dir, sock, log_level):
+    """Worker process entry point: serve backend.main:app on the inherited socket"""
+    import uvicorn
+    os.environ["ISG_WORKER_ID"] = str(worker_id)
+    os.environ["ISG_WORKER_COUNT"] = str(worker_count)
+    os.environ["ISG_BUS_DIR"] = bus_dir
+    config = uvicorn.Config("backend.main:app", log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    import multiprocessing
+    import socket
+
+    parser = argparse.ArgumentParser(description="Run several game workers sharing one port")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bus-dir", default=None, help="Directory for the workers' Unix sockets")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    bus_dir = args.bus_dir or tempfile.mkdtemp(prefix="isg-bus-")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.set_inheritable(True)
+    print(f"[CLUSTER] {args.workers} workers on {args.host}:{args.port}, bus in {bus_dir}")
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_worker, args=(i, args.workers, bus_dir, sock, args.log_level))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,240 @@
 import json
 import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    saved_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    room_code TEXT,
+    name TEXT,
+    data TEXT NOT NULL,
+    saved_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_room_code ON sessions (room_code);
+CREATE INDEX IF NOT EXISTS idx_sessions_name ON sessions (name);
+CREATE TABLE IF NOT EXISTS events (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ConnectionPool:
+    """Small pool of SQLite connections shared by every Database on the same file"""
+
+    def __init__(self, path, size=4):
+        self.path = str(path)
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting for one if the pool is exhausted"""
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            conn = self._connect() if create else self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    """Shared connection pool for a database file"""
+    key = os.path.abspath(path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(key)
+        return _pools[key]
+
+
 class Database:
-    """Simple JSON-based database for game state persistence"""
-    
-    def __init__(self, db_path="data"):
+    """SQLite-backed database for game state persistence"""
+
+    def __init__(self, db_path="data", filename="game.db"):
         self.db_path = Path(db_path)
         self.db_path.mkdir(exist_ok=True)
-        
+
+        # Legacy JSON files, only read by migrate_from_json()
         self.players_file = self.db_path / "players.json"
         self.sessions_file = self.db_path / "sessions.json"
         self.events_file = self.db_path / "events.json"
-    
+
+        self.db_file = self.db_path / filename
+        self.pool = get_pool(self.db_file)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        if not self._get_meta("json_migrated"):
+            self.migrate_from_json()
+
+    @contextmanager
+    def transaction(self):
+        """Pooled connection wrapped in a write transaction"""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
     def save_player(self, player_data):
         """Save or update player data"""
-        players = self.load_players()
-        players[player_data["name"]] = {
-            **player_data,
-            "saved_at": datetime.now().isoformat()
-        }
-        self._write_json(self.players_file, players)
-    
+        with self.transaction() as conn:
+            self._save_player(conn, player_data)
+
+    def _save_player(self, conn, player_data):
+        saved_at = datetime.now().isoformat()
+        data = {**player_data, "saved_at": saved_at}
+        conn.execute(
+            "INSERT OR REPLACE INTO players (name, data, saved_at) VALUES (?, ?, ?)",
+            (player_data["name"], json.dumps(data), saved_at)
+        )
+
     def load_players(self):
         """Load all saved players"""
-        return self._read_json(self.players_file, {})
-    
+        rows = self._query("SELECT name, data FROM players ORDER BY rowid")
+        return {name: json.loads(data) for name, data in rows}
+
     def get_player(self, player_name):
         """Get specific player data"""
-        players = self.load_players()
-        return players.get(player_name)
-    
-    def save_session(self, session_data):
+        rows = self._query("SELECT data FROM players WHERE name = ?", (player_name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_session(self, session_data, session_id=None):
         """Save game session"""
-        sessions = self.load_sessions()
-        session_id = session_data.get("id", str(datetime.now().timestamp()))
-        sessions[session_id] = {
-            **session_data,
-            "saved_at": datetime.now().isoformat()
-        }
-        self._write_json(self.sessions_file, sessions)
+        session_id = session_id or session_data.get("id", str(datetime.now().timestamp()))
+        with self.transaction() as conn:
+            self._save_session(conn, session_data, session_id)
         return session_id
-    
+
+    def _save_session(self, conn, session_data, session_id):
+        saved_at = datetime.now().isoformat()
+        data = {**session_data, "saved_at": saved_at}
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, room_code, name, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+            (session_id, session_data.get("room_code"), session_data.get("name"), json.dumps(data), saved_at)
+        )
+
     def load_sessions(self):
         """Load all sessions"""
-        return self._read_json(self.sessions_file, {})
-    
+        rows = self._query("SELECT id, data FROM sessions ORDER BY rowid")
+        return {session_id: json.loads(data) for session_id, data in rows}
+
     def get_session(self, session_id):
         """Get specific session"""
-        sessions = self.load_sessions()
-        return sessions.get(session_id)
-    
+        rows = self._query("SELECT data FROM sessions WHERE id = ?", (session_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def find_sessions(self, room_code=None, name=None):
+        """Sessions matching a room code and/or session name"""
+        clauses, params = [], []
+        if room_code is not None:
+            clauses.append("room_code = ?")
+            params.append(room_code)
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT id, data FROM sessions{where} ORDER BY rowid", params)
+        return {session_id: json.loads(data) for session_id, data in rows}
+
     def save_events(self, events, session_id):
         """Save game events for a session"""
-        all_events = self._read_json(self.events_file, {})
-        all_events[session_id] = events
-        self._write_json(self.events_file, all_events)
-    
+        with self.transaction() as conn:
+            self._save_events(conn, events, session_id)
+
+    def _save_events(self, conn, events, session_id):
+        conn.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+        conn.executemany(
+            "INSERT INTO events (session_id, position, data) VALUES (?, ?, ?)",
+            ((session_id, i, json.dumps(e)) for i, e in enumerate(events))
+        )
+
+    def write_batch(self, writes):
+        """Apply several writes in one transaction. Each write is a
+        (method name, args) pair naming save_player, save_session or save_events."""
+        with self.transaction() as conn:
+            for method, args in writes:
+                getattr(self, f"_{method}")(conn, *args)
+
     def get_events(self, session_id):
         """Get events for a session"""
-        all_events = self._read_json(self.events_file, {})
-        return all_events.get(session_id, [])
-    
+        rows = self._query("SELECT data FROM events WHERE session_id = ? ORDER BY position", (session_id,))
+        return [json.loads(data) for (data,) in rows]
+
+    def _get_meta(self, key):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def migrate_from_json(self):
+        """One-shot import of the legacy players/sessions/events JSON files.
+        The JSON files are left in place; a meta flag stops re-imports."""
+        players = self._read_json(self.players_file, {})
+        sessions = self._read_json(self.sessions_file, {})
+        events = self._read_json(self.events_file, {})
+        with self.transaction() as conn:
+            if conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone():
+                return {}
+            conn.executemany(
+                "INSERT OR IGNORE INTO players (name, data, saved_at) VALUES (?, ?, ?)",
+                [(name, json.dumps(data), data.get("saved_at")) for name, data in players.items()]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO sessions (id, room_code, name, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+                [(sid, data.get("room_code"), data.get("name"), json.dumps(data), data.get("saved_at"))
+                 for sid, data in sessions.items()]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO events (session_id, position, data) VALUES (?, ?, ?)",
+                [(sid, i, json.dumps(e)) for sid, session_events in events.items() for i, e in enumerate(session_events)]
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (datetime.now().isoformat(),)
+            )
+        counts = {"players": len(players), "sessions": len(sessions), "events": len(events)}
+        if any(counts.values()):
+            print(f"[DB] Migrated JSON data into {self.db_file}: {counts}")
+        return counts
+
     def _read_json(self, file_path, default=None):
         """Read JSON file safely"""
         try:
@@ -72,16 +244,6 @@ class Database:
         except (json.JSONDecodeError, IOError):
             pass
         return default if default is not None else {}
-    
-    def _write_json(self, file_path, data):
-        """Write JSON file safely"""
-        try:
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=2)
-            return True
-        except IOError as e:
-            print(f"Error writing to {file_path}: {e}")
-            return False
 
 # Global database instance
 db = Database()
@@ -0,0 +1,134 @@
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def encode_json(message):
+    """Encode a message to JSON text once so it can be sent to many sockets.
+    Uses orjson when installed and falls back to the stdlib encoder."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+# Wire protocols a websocket client can negotiate (?protocol=... or a subprotocol)
+SUBPROTOCOLS = {"isg.json": "json", "isg.msgpack": "msgpack", "isg.msgpack+deflate": "msgpack+deflate"}
+PROTOCOLS = tuple(SUBPROTOCOLS.values())
+# Query values that mean a protocol: an unescaped "+" in a query string arrives as a space
+PROTOCOL_ALIASES = {"msgpack deflate": "msgpack+deflate"}
+
+# Short keys used in MessagePack frames
+KEY_ALIASES = {
+    "type": "t", "player": "p", "room": "r", "target": "tg", "timestamp": "ts", "seq": "s",
+    "message": "m", "text": "x", "events": "e", "visibility": "v", "volume": "vl", "ability": "a"
+}
+KEY_NAMES = {alias: key for key, alias in KEY_ALIASES.items()}
+INTERNED_KEYS = frozenset(("player", "room", "target"))  # Keys whose known names are sent as table ids
+
+FRAME_PLAIN = 0
+FRAME_DEFLATE = 1
+
+
+def negotiate_protocol(requested=None, subprotocols=()):
+    """Pick the wire protocol for a new websocket from the offered subprotocols
+    or the ?protocol= query value. Returns (protocol, subprotocol to accept or None).
+    Falls back to JSON when msgpack is not installed."""
+    for subprotocol in subprotocols:
+        protocol = SUBPROTOCOLS.get(subprotocol)
+        if protocol == "json" or (protocol and msgpack is not None):
+            return protocol, subprotocol
+    requested = PROTOCOL_ALIASES.get(requested, requested)
+    if requested in PROTOCOLS and (requested == "json" or msgpack is not None):
+        return requested, None
+    return "json", None
+
+
+class MsgPackCodec:
+    """MessagePack frames for binary clients.
+
+    Keys in KEY_ALIASES are shortened, and player/room/target values that
+    known_name() accepts (the session's room and player names) become ids
+    from a table shared by one session's binary connections; anything else,
+    such as free-form ability targets, is sent as a plain string. New ids are
+    announced with a {"t": "ids", "add": {id: name}} frame before their first
+    use. Every frame starts with one byte: FRAME_PLAIN, or FRAME_DEFLATE for
+    zlib-compressed frames ("msgpack+deflate" clients, frames of at least
+    deflate_threshold bytes). Client frames use the same layout; short or
+    full keys and ids or names are all accepted.
+    """
+
+    def __init__(self, deflate_threshold=1024, known_name=None):
+        self.deflate_threshold = deflate_threshold
+        self.known_name = known_name or (lambda name: False)
+        self.ids = {}  # name -> id
+        self.names = []  # id -> name
+
+    def _compact(self, value, added, interned=False):
+        if interned and isinstance(value, str):
+            value_id = self.ids.get(value)
+            if value_id is None:
+                if not self.known_name(value):
+                    return value
+                value_id = self.ids[value] = len(self.names)
+                self.names.append(value)
+                added[value_id] = value
+            return value_id
+        if isinstance(value, dict):
+            return {
+                KEY_ALIASES.get(k, k): self._compact(v, added, k in INTERNED_KEYS)
+                for k, v in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._compact(v, added) for v in value]
+        return value
+
+    def pack(self, message):
+        """(payload, new table entries) for a message"""
+        added = {}
+        payload = msgpack.packb(self._compact(message, added), use_bin_type=True)
+        return payload, added
+
+    def frame(self, payload, deflate=False):
+        """Frame bytes for a packed payload, compressed when worthwhile"""
+        if deflate and len(payload) >= self.deflate_threshold:
+            return bytes((FRAME_DEFLATE,)) + zlib.compress(payload, 6)
+        return bytes((FRAME_PLAIN,)) + payload
+
+    def table_frame(self, entries=None):
+        """Frame announcing table entries (all of them by default)"""
+        if entries is None:
+            entries = dict(enumerate(self.names))
+        return self.frame(msgpack.packb({"t": "ids", "add": entries}, use_bin_type=True))
+
+    def _expand(self, value, interned=False):
+        if interned and isinstance(value, int) and 0 <= value < len(self.names):
+            return self.names[value]
+        if isinstance(value, dict):
+            expanded = {}
+            for k, v in value.items():
+                key = KEY_NAMES.get(k, k)
+                expanded[key] = self._expand(v, key in INTERNED_KEYS)
+            return expanded
+        if isinstance(value, list):
+            return [self._expand(v) for v in value]
+        return value
+
+    def decode(self, data):
+        """Message dict from a client frame"""
+        if data[:1] == bytes((FRAME_DEFLATE,)):
+            data = zlib.decompress(data[1:])
+        else:
+            data = data[1:]
+        return self._expand(msgpack.unpackb(data, raw=False, strict_map_key=False))
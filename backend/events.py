@@ -1,20 +1,177 @@
 import time
 import json
+import heapq
+from collections import deque
+from collections.abc import Sequence
+
+
+class EventView(Sequence):
+    """Read-only window over a contiguous range of sequence numbers in an EventBuffer.
+    Indexing and iteration read straight from the ring, nothing is copied."""
+    
+    def __init__(self, buffer, start_seq, end_seq):
+        self._buffer = buffer
+        self.start_seq = start_seq  # First seq in the view (inclusive)
+        self.end_seq = end_seq  # Last seq in the view (inclusive)
+    
+    def __len__(self):
+        return max(0, self.end_seq - self.start_seq + 1)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return EventView(self._buffer, self.start_seq + start, self.start_seq + stop - 1)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("event view index out of range")
+        return self._buffer.get(self.start_seq + index)
+    
+    def __iter__(self):
+        get = self._buffer.get
+        for seq in range(self.start_seq, self.end_seq + 1):
+            yield get(seq)
+    
+    def __reversed__(self):
+        get = self._buffer.get
+        for seq in range(self.end_seq, self.start_seq - 1, -1):
+            yield get(seq)
+
+
+class EventBuffer:
+    """Fixed-capacity ring buffer of events keyed by a global sequence number.
+    Appends are O(1); since()/last() return views in O(1) and read in O(k)."""
+    
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self.last_seq = 0  # Sequence number of the newest event
+    
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest event still retained"""
+        return max(1, self.last_seq - self.capacity + 1)
+    
+    def append(self, event):
+        """Store event, overwriting the oldest slot when full. Returns its seq."""
+        self.last_seq += 1
+        self._slots[self.last_seq % self.capacity] = event
+        return self.last_seq
+    
+    def get(self, seq):
+        """Get the event with the given seq (must still be retained)"""
+        if not self.first_seq <= seq <= self.last_seq:
+            raise KeyError(seq)
+        return self._slots[seq % self.capacity]
+    
+    def slot(self, seq):
+        """Whatever the slot of seq holds now, without the retention check.
+        For readers outside the event loop: the event may since have been
+        overwritten, so compare its "seq" with the one asked for."""
+        return self._slots[seq % self.capacity]
+    
+    def since(self, seq):
+        """View of all retained events with a sequence number greater than seq"""
+        return EventView(self, max(seq + 1, self.first_seq), self.last_seq)
+    
+    def last(self, k):
+        """View of the newest k events"""
+        return EventView(self, max(self.last_seq - k + 1, self.first_seq), self.last_seq)
+    
+    def view(self):
+        """View of every retained event"""
+        return EventView(self, self.first_seq, self.last_seq)
+    
+    def __len__(self):
+        return min(self.last_seq, self.capacity)
+    
+    def __iter__(self):
+        return iter(self.view())
+    
+    def __getitem__(self, index):
+        return self.view()[index]
+
 
 class EventEngine:
     def __init__(self, map_obj):
         self.map = map_obj
-        self.events = []  # Event queue
         self.max_events = 1000  # Keep last 1000 events
+        self.events = EventBuffer(self.max_events)  # Event queue
+        self.filter_window = 100  # Recent events considered for visibility
+        self.listeners = []  # Called with each new event (e.g. the session journal)
+        
+        # Secondary indexes of event seqs, kept in seq order as events are added
+        self.room_index = {}  # room -> every event in that room
+        self.visibility_index = {
+            "global": deque(),
+            "room": {},  # room -> events visible to that room
+            "whisper": {},  # player -> whispers by that player
+            "ai_event": deque()  # AI events, visible by sound propagation
+        }
+    
+    @property
+    def last_seq(self):
+        """Sequence number of the newest event"""
+        return self.events.last_seq
         
     def add_event(self, event):
-        """Add event with timestamp"""
+        """Add event with timestamp and a monotonic sequence number"""
+        event["seq"] = self.last_seq + 1
         event["timestamp"] = time.time()
-        self.events.append(event)
+        seq = self.events.append(event)
+        self._index_event(event, seq)
+        for listener in self.listeners:
+            listener(event)
+
+    def replay_event(self, event):
+        """Re-add a persisted event keeping its original seq and timestamp"""
+        if event["seq"] <= self.last_seq:
+            return
+        self.events.last_seq = event["seq"] - 1
+        seq = self.events.append(event)
+        self._index_event(event, seq)
+
+    def _index_event(self, event, seq):
+        """Record the event's seq in the indexes that can make it visible"""
+        first_seq = self.events.first_seq
+        visibility = event.get("visibility", "global")
+        event_room = event.get("room", "")
         
-        # Keep event buffer bounded
-        if len(self.events) > self.max_events:
-            self.events = self.events[-self.max_events:]
+        self._index_append(self.room_index.setdefault(event_room, deque()), seq, first_seq)
+        if visibility == "global":
+            self._index_append(self.visibility_index["global"], seq, first_seq)
+            return
+        if visibility == "room":
+            rooms = self.visibility_index["room"]
+            self._index_append(rooms.setdefault(event_room, deque()), seq, first_seq)
+        elif visibility == "whisper":
+            whispers = self.visibility_index["whisper"]
+            self._index_append(whispers.setdefault(event.get("player"), deque()), seq, first_seq)
+        if event.get("type") == "ai_event":
+            self._index_append(self.visibility_index["ai_event"], seq, first_seq)
+
+    @staticmethod
+    def _index_append(index, seq, first_seq):
+        """Append seq and drop entries that fell out of the ring buffer"""
+        index.append(seq)
+        while index[0] < first_seq:
+            index.popleft()
+
+    @staticmethod
+    def _index_tail(index, after_seq):
+        """Seqs in index greater than after_seq, oldest first"""
+        if index is None:
+            return []
+        tail = []
+        for seq in reversed(index):
+            if seq <= after_seq:
+                break
+            tail.append(seq)
+        tail.reverse()
+        return tail
 
     def process_action(self, player, action):
         """Process player action and create events"""
@@ -42,36 +199,66 @@ class EventEngine:
                 "visibility": "whisper" if whisper else "room"
             })
 
-    def filter_events_for_player(self, player):
-        """Filter events visible to player based on awareness and location"""
+    def filter_events_for_player(self, player, since_seq=None):
+        """Filter events visible to player based on awareness and location.
+        Only events newer than since_seq are considered (as far back as the buffer
+        goes); without a cursor, the last filter_window events."""
         filtered = []
         player_room = player.get_room_name()
+        if since_seq is None:
+            since_seq = self.last_seq - self.filter_window
+        after_seq = max(since_seq, self.events.first_seq - 1)
+        tail = self._index_tail
         
-        for event in self.events[-100:]:  # Last 100 events
-            visibility = event.get("visibility", "global")
+        direct = heapq.merge(
+            tail(self.visibility_index["global"], after_seq),
+            tail(self.visibility_index["room"].get(player_room), after_seq),
+            tail(self.visibility_index["whisper"].get(player.name), after_seq)
+        )
+        heard = []
+        for seq in tail(self.visibility_index["ai_event"], after_seq):
+            event = self.events.get(seq)
             event_room = event.get("room", "")
-            
             try:
-                if visibility == "global":
-                    filtered.append(event)
-                elif visibility == "room" and event_room == player_room:
-                    filtered.append(event)
-                elif visibility == "whisper" and event.get("player") == player.name:
-                    filtered.append(event)
-                elif event.get("type") == "ai_event":
-                    # AI events visible based on sound propagation (awareness)
-                    if event_room == player_room or player.can_hear_event(event_room, event.get("volume", 1)):
-                        filtered.append(event)
+                # AI events visible based on sound propagation (awareness)
+                if event_room == player_room or player.can_hear_event(event_room, event.get("volume", 1)):
+                    heard.append(seq)
             except Exception as e:
                 print(f"Error filtering event for {player.name}: {e}")
                 continue
         
+        previous = None
+        for seq in heapq.merge(direct, heard):
+            if seq != previous:
+                filtered.append(self.events.get(seq))
+                previous = seq
+        
         return filtered
 
     def get_events_for_room(self, room_name):
         """Get all recent events for a specific room"""
-        return [e for e in self.events[-50:] if e.get("room") == room_name]
+        after_seq = max(self.last_seq - 50, self.events.first_seq - 1)
+        return [self.events.get(seq) for seq in self._index_tail(self.room_index.get(room_name), after_seq)]
     
     def get_events_for_player(self, player):
         """Wrapper for filter_events_for_player"""
         return self.filter_events_for_player(player)
+
+    def start_cursor(self):
+        """Cursor for a new player: they catch up on the recent filter_window only"""
+        return max(0, self.last_seq - self.filter_window)
+
+    def is_truncated(self, since_seq):
+        """Whether events after since_seq have already left the buffer"""
+        return since_seq + 1 < self.events.first_seq
+
+    def pull_events_for_player(self, player):
+        """Return visible events newer than the player's cursor and advance it"""
+        filtered = self.filter_events_for_player(player, since_seq=player.last_seq)
+        player.last_seq = self.last_seq
+        return filtered
+
+    def resync_player(self, player, since_seq=0):
+        """Reset the player's cursor to since_seq and return everything visible after it"""
+        player.last_seq = max(0, min(since_seq, self.last_seq))
+        return self.pull_events_for_player(player)
@@ -0,0 +1,196 @@
+import asyncio
+from collections import deque
+from backend.encoding import MsgPackCodec, encode_json
+from backend.metrics import SEND_FAILURES
+
+
+class Connection:
+    """Bounded outbound queue plus a writer task for one player's websocket"""
+
+    def __init__(self, player_id, websocket, fanout, protocol="json"):
+        self.player_id = player_id
+        self.websocket = websocket
+        self.fanout = fanout
+        self.protocol = protocol  # "json", "msgpack" or "msgpack+deflate"
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.task = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.resync = False  # Binary client lost frames: send the whole id table next
+
+    def enqueue(self, frame):
+        """Queue an encoded frame without waiting. Returns False if the connection is gone."""
+        if self.closed:
+            return False
+        if len(self.queue) >= self.fanout.max_queue:
+            if self.fanout.overflow == "disconnect":
+                print(f"[FANOUT] {self.player_id} send queue full, dropping client")
+                self.close()
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+            self.fanout.dropped += 1
+            if self.protocol != "json":
+                self.resync = True  # The dropped frame may have announced ids
+        self.queue.append(frame)
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.ready.set()
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.writer())
+        return True
+
+    async def writer(self):
+        """Drain the queue to the websocket, one send at a time"""
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                if self.resync:
+                    self.resync = False
+                    frame = self.fanout.codec().table_frame()
+                else:
+                    frame = self.queue.popleft()
+                send = self.websocket.send_bytes if isinstance(frame, bytes) else self.websocket.send_text
+                try:
+                    await asyncio.wait_for(send(frame), self.fanout.send_timeout)
+                    self.sent += 1
+                except Exception as e:
+                    print(f"[FANOUT] Error to {self.player_id}: {type(e).__name__}")
+                    self.fanout.send_failures += 1
+                    SEND_FAILURES.inc()
+                    self.close()
+        except asyncio.CancelledError:
+            pass
+
+    def close(self):
+        """Stop writing, drop anything queued and tell the owner the client is gone"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self.ready.set()
+        self.fanout.disconnected += 1
+        self.fanout.unregister(self.player_id, self.websocket)
+        if self.fanout.on_close:
+            self.fanout.on_close(self.player_id, self.websocket)
+
+
+class FanOut:
+    """Per-connection send queues so one slow client never delays the others.
+
+    overflow="drop_oldest" discards the oldest queued message when a queue is
+    full; overflow="disconnect" drops the client instead.
+
+    Each connection speaks JSON (text frames) or MessagePack (binary frames,
+    see MsgPackCodec); a message is encoded at most once per protocol.
+    """
+
+    def __init__(self, max_queue=256, send_timeout=5.0, overflow="drop_oldest", on_close=None, known_name=None):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.overflow = overflow
+        self.on_close = on_close  # Called as on_close(player_id, websocket)
+        self.connections = {}
+        self.dropped = 0
+        self.disconnected = 0
+        self.send_failures = 0
+        self.msgpack = None  # MsgPackCodec shared by binary connections, created on first use
+        self.known_name = known_name  # Which strings the codec may turn into table ids
+
+    def codec(self):
+        if self.msgpack is None:
+            self.msgpack = MsgPackCodec(known_name=self.known_name)
+        return self.msgpack
+
+    def register(self, player_id, websocket, protocol="json"):
+        """Create the outbound queue for a websocket, replacing any previous one"""
+        previous = self.connections.get(player_id)
+        if previous is not None:
+            previous.closed = True
+            if previous.task:
+                previous.task.cancel()
+        connection = Connection(player_id, websocket, self, protocol)
+        self.connections[player_id] = connection
+        if protocol != "json" and self.codec().names:
+            connection.enqueue(self.codec().table_frame())
+        return connection
+
+    def unregister(self, player_id, websocket=None):
+        """Stop the writer for player_id (only if it still owns websocket, when given)"""
+        connection = self.connections.get(player_id)
+        if connection is None or (websocket is not None and connection.websocket is not websocket):
+            return
+        del self.connections[player_id]
+        connection.closed = True
+        if connection.task and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+
+    def send(self, player_id, message):
+        """Queue a message for one player"""
+        connection = self.connections.get(player_id)
+        if connection is None:
+            return False
+        return connection.enqueue(self.encode(message, connection.protocol, {}))
+
+    def send_frame(self, player_id, frame):
+        """Queue an already encoded frame for one player"""
+        connection = self.connections.get(player_id)
+        if connection is None:
+            return False
+        return connection.enqueue(frame)
+
+    def broadcast(self, player_ids, message):
+        """Encode message once and queue it for several players.
+        Returns how many accepted it."""
+        frames = {}  # protocol -> frame (plus the packed MessagePack payload)
+        delivered = 0
+        for player_id in player_ids:
+            connection = self.connections.get(player_id)
+            if connection is not None and connection.enqueue(self.encode(message, connection.protocol, frames)):
+                delivered += 1
+        return delivered
+
+    def encode(self, message, protocol, frames):
+        """Frame of message for protocol, memoized in frames for one send"""
+        frame = frames.get(protocol)
+        if frame is None:
+            if protocol == "json":
+                frame = encode_json(message)
+            else:
+                payload = frames.get("payload")
+                if payload is None:
+                    payload, added = self.codec().pack(message)
+                    frames["payload"] = payload
+                    if added:
+                        self._announce(added)
+                frame = self.codec().frame(payload, deflate=protocol == "msgpack+deflate")
+            frames[protocol] = frame
+        return frame
+
+    def _announce(self, entries):
+        """Tell every binary connection about new table ids"""
+        frame = self.codec().table_frame(entries)
+        for connection in self.connections.values():
+            if connection.protocol != "json":
+                connection.enqueue(frame)
+
+    def decode(self, data):
+        """Message dict from a binary client frame"""
+        return self.codec().decode(data)
+
+    def metrics(self):
+        """Queue depth and drop counters across all connections"""
+        depths = [len(c.queue) for c in self.connections.values()]
+        return {
+            "connections": len(self.connections),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "send_failures": self.send_failures
+        }
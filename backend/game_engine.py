@@ -1,25 +1,49 @@
 import asyncio
+import itertools
 import json
-import random
-from backend.players import Player
+import logging
+import time
+from collections import deque
+from backend.players import Player, PlayerTable
 from backend.maps import MapGenerator
 from backend.events import EventEngine
-from backend.ai_module import AIEngine
+from backend.ai_module import AIEngine, BatchAIController, AI_CHATS
+from backend.encoding import encode_json
+from backend.fanout import FanOut
+from backend.metrics import ACTION_SECONDS, ACTION_TYPES, BROADCAST_SECONDS
 from backend.utils import ROLES, ABILITIES
 
+logger = logging.getLogger(__name__)
+
 class GameEngine:
-    def __init__(self):
+    # Event types delivered at once instead of waiting for the next flush
+    IMMEDIATE_EVENT_TYPES = {"whisper"}
+
+    def __init__(self, room_code=None, story=None, flush_interval=0.025, map_obj=None, player_table=False):
+        self.room_code = room_code  # Session this engine serves (see SessionManager)
+        self.story = story or {}  # Story settings from /story/new (world, genre, ...)
         self.players = {}
-        self.map = MapGenerator().generate_default_map()
+        self.map = map_obj or MapGenerator().generate_default_map()
         self.event_engine = EventEngine(self.map)
         self.ai_engine = AIEngine()
         self.rooms = self.map.rooms
+        self.player_table = None  # Optional PlayerTable for bulk queries over player state
+        self.ai_controller = BatchAIController(self.map.graph)
         self.mode = "game"  # "story" or "game"
         self.difficulty = "normal"  # "easy", "normal", "hard"
         self.max_players = 8
         self.ai_slots = 0
         self.started = False
         self.events_log = []
+        self.fanout = FanOut(on_close=self.on_connection_closed, known_name=self.is_known_name)
+        self.flush_interval = flush_interval  # Seconds events are coalesced before delivery (0 = at once)
+        self.dirty = set()  # Players with events waiting for the next flush
+        self.flush_handle = None
+        self.scheduler = None  # AIScheduler driving this session's AI ticks
+        self.last_active = time.time()
+        self.journal = None
+        if player_table:
+            self.enable_player_table()
         
     def set_game_mode(self, mode, difficulty="normal", ai_slots=0):
         """Set game mode: 'story' (1 player) or 'game' (2-8 players)"""
@@ -32,14 +56,135 @@ class GameEngine:
         elif mode == "game":
             self.max_players = 8
 
+    def attach_journal(self, journal):
+        """Journal every new event; restores from the journal if it has history"""
+        if journal.exists():
+            self.restore(journal)
+        self.journal = journal
+        self.event_engine.listeners.append(journal.append)
+
+    def snapshot(self):
+        """Compact state of the session (events live in the journal)"""
+        return {
+            "room_code": self.room_code,
+            "story": self.story,
+            "mode": self.mode,
+            "difficulty": self.difficulty,
+            "ai_slots": self.ai_slots,
+            "started": self.started,
+            "last_seq": self.event_engine.last_seq,
+            "players": [{**p.to_dict(), "player_id": p.player_id} for p in self.players.values()],
+            "rooms": {
+                name: {"noise_level": room.noise_level, "items": room.items}
+                for name, room in self.rooms.items()
+            }
+        }
+
+    async def save_snapshot(self, force=False):
+        """Flush the journal and write a snapshot (off the event loop) if
+        anything happened since the last one"""
+        if not self.journal:
+            return
+        if force or self.journal.last_seq != self.journal.snapshot_seq:
+            await asyncio.to_thread(self.journal.write_snapshot, self.snapshot())
+
+    def restore(self, journal):
+        """Rebuild the session from its last snapshot plus the journal tail.
+        AI players come back; humans reconnect and resync by seq."""
+        state = journal.load_snapshot() or {}
+        self.mode = state.get("mode", self.mode)
+        self.difficulty = state.get("difficulty", self.difficulty)
+        self.ai_slots = state.get("ai_slots", self.ai_slots)
+        self.started = state.get("started", self.started)
+        self.story = state.get("story") or self.story
+        for name, room_state in state.get("rooms", {}).items():
+            room = self.rooms.get(name)
+            if room:
+                room.noise_level = room_state.get("noise_level", 0)
+                room.items = room_state.get("items", [])
+        for player_state in state.get("players", []):
+            if player_state.get("is_ai"):
+                player = self.add_ai_player(player_state["player_id"])
+                if player_state.get("current_room") in self.rooms:
+                    player.set_room(player_state["current_room"])
+                player.role = player_state.get("role")
+                player.abilities = player_state.get("abilities", [])
+        
+        # Replay from the oldest record the event buffer held at snapshot time
+        for event in journal.read(offset=state.get("replay_offset", 0), track_offsets=True):
+            self.event_engine.replay_event(event)
+        journal.snapshot_seq = journal.last_seq
+        print(f"[RESTORE] Session {self.room_code} restored up to seq {self.event_engine.last_seq}")
+
+    def touch(self):
+        """Mark the session as active (used for idle eviction)"""
+        self.last_active = time.time()
+
+    def human_count(self):
+        """Number of connected non-AI players"""
+        return sum(1 for p in self.players.values() if not p.is_ai)
+
+    def iter_events(self, after_seq=0, source="auto", encoded=False):
+        """Iterator over events with seq > after_seq, one at a time, from the
+        in-memory buffer ("memory") or the whole journaled history ("journal";
+        "auto" uses the journal when there is one). encoded=True yields JSON
+        strings. Call it on the event loop: memory reads cover the buffer as it
+        is now, so the iterator can then run in a worker thread while events
+        keep arriving."""
+        if source == "journal" or (source == "auto" and self.journal):
+            if not self.journal:
+                raise ValueError("Session has no journal")
+            if encoded:
+                return self.journal.read_raw(after_seq=after_seq)
+            return self.journal.read(after_seq=after_seq)
+        buffer = self.event_engine.events
+        events = self._iter_buffer(max(after_seq, buffer.first_seq - 1), buffer.last_seq)
+        return (encode_json(event) for event in events) if encoded else events
+
+    def _iter_buffer(self, after_seq, last_seq):
+        """Buffered events after_seq < seq <= last_seq. Events overwritten
+        while reading are taken from the journal (without one they are lost)."""
+        buffer = self.event_engine.events
+        for seq in range(after_seq + 1, last_seq + 1):
+            event = buffer.slot(seq)
+            if event is None or event["seq"] != seq:
+                if self.journal:
+                    yield from itertools.takewhile(lambda e: e["seq"] <= last_seq, self.journal.read(after_seq=seq - 1))
+                return
+            yield event
+
+    def event_page(self, after=None, before=None, limit=100):
+        """One page of the event log by seq cursor: events after `after`
+        (oldest first), or the newest `limit` events before `before` (or
+        overall). Older pages than the buffer holds come from the journal.
+        Returns (events, source)."""
+        buffer = self.event_engine.events
+        if after is not None:
+            if after + 1 >= buffer.first_seq or not self.journal:
+                return list(buffer.since(after)[:limit]), "memory"
+            return list(itertools.islice(self.journal.read(after_seq=after), limit)), "journal"
+        if before is None:
+            return list(buffer.last(limit)), "memory"
+        if before - limit >= buffer.first_seq or not self.journal:
+            start = max(before - limit, buffer.first_seq)
+            return [buffer.get(seq) for seq in range(start, min(before, buffer.last_seq + 1))], "memory"
+        window = deque(maxlen=limit)
+        for event in self.journal.read(after_seq=max(before - limit - 1, 0)):
+            if event.get("seq", 0) >= before:
+                break
+            window.append(event)
+        return list(window), "journal"
+
     async def connect_player(self, websocket, player_id):
         """Handle new player connection"""
-        print(f"\n[CONNECT] {player_id} attempting connection...")
+        logger.debug("[CONNECT] %s attempting connection", player_id)
         try:
             player = Player(player_id, websocket, self.map)
-            self.players[player_id] = player
+            player.last_seq = self.event_engine.start_cursor()
+            self._add_player(player)
+            self.fanout.register(player_id, websocket)
             await websocket.accept()
-            print(f"[CONNECT] {player_id} accepted")
+            logger.debug("[CONNECT] %s accepted", player_id)
             
             # Send welcome and player state
             welcome_msg = {
@@ -49,52 +194,137 @@ class GameEngine:
                 "difficulty": self.difficulty,
                 "player": player.to_dict()
             }
-            print(f"[CONNECT] {player_id} sending welcome: {welcome_msg}")
             await websocket.send_json(welcome_msg)
-            print(f"[CONNECT] {player_id} welcome sent")
+            logger.debug("[CONNECT] %s welcome sent", player_id)
             
             # Start listening for this player
             asyncio.create_task(self.listen_player(player))
-            print(f"[CONNECT] {player_id} listen task started")
+            logger.debug("[CONNECT] %s listen task started", player_id)
         except Exception as e:
-            print(f"[CONNECT] {player_id} error: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[CONNECT] %s error: %s", player_id, type(e).__name__)
 
-    def setup_player(self, websocket, player_id, room_code=None):
+    def setup_player(self, websocket, player_id, room_code=None, protocol="json"):
         """Setup a player without accepting websocket (endpoint handles accept).
         Optionally associate the player with a story room_code."""
         player = Player(player_id, websocket, self.map)
         if room_code:
             player.room_code = room_code
-        self.players[player_id] = player
-        print(f"[SETUP] Player {player_id} created, room: {player.current_room}, room_code: {room_code}")
+        player.last_seq = self.event_engine.start_cursor()
+        self._add_player(player)
+        self.fanout.register(player_id, websocket, protocol)
+        self.touch()
+        logger.debug("[SETUP] Player %s created, room: %s, room_code: %s", player_id, player.current_room, room_code)
+        return player
+
+    async def join(self, websocket, player_id, room_code=None, since=None, protocol="json"):
+        """Set up a player on an accepted websocket, queue the welcome message and,
+        when since is given, replay the events the client missed"""
+        player = self.setup_player(websocket, player_id, room_code=room_code, protocol=protocol)
+        
+        # include total players and player index in welcome for proper client numbering
+        player_list = list(self.players.keys())
+        player_index = player_list.index(player.player_id) + 1 if player.player_id in player_list else 1
+        welcome_msg = {
+            "type": "welcome",
+            "message": f"Welcome {player_id}!",
+            "mode": self.mode,
+            "difficulty": self.difficulty,
+            "player": player.to_dict(),
+            "total_players": len(self.players),
+            "player_index": player_index,
+            "room_code": room_code,
+            "seq": self.event_engine.last_seq,
+            "protocol": protocol
+        }
+        # Queued through the fan-out so it is always delivered before any events
+        self.fanout.send(player_id, welcome_msg)
+        logger.debug("[JOIN] Welcome queued for %s (index %d)", player_id, player_index)
+        
+        # Reconnecting clients may pass since=<seq> to catch up on missed events
+        if since is not None and str(since).isdigit():
+            await self.resync_player(player, int(since))
         return player
 
     async def listen_player(self, player):
         """Listen for player actions"""
         try:
-            print(f"[LISTEN] Starting for {player.name}")
+            logger.debug("[LISTEN] Starting for %s", player.name)
             while True:
                 data = await player.websocket.receive_json()
-                print(f"[LISTEN] {player.name} received: {data.get('type')}")
+                logger.debug("[LISTEN] %s received: %s", player.name, data.get("type"))
                 await self.handle_action(player, data)
         except Exception as e:
-            print(f"[LISTEN] {player.name} error: {type(e).__name__}")
+            logger.debug("[LISTEN] %s error: %s", player.name, type(e).__name__)
         finally:
-            if player.player_id in self.players:
-                del self.players[player.player_id]
-            print(f"[LISTEN] {player.name} stopped")
+            self.remove_player(player)
+            logger.debug("[LISTEN] %s stopped", player.name)
+
+    def is_known_name(self, name):
+        """Whether name is one of this session's rooms or players"""
+        return name in self.rooms or name in self.players
+
+    def enable_player_table(self):
+        """Mirror player state into a PlayerTable (see PlayerTable.idle_players and
+        players_within). Off by default: every move and state write then also
+        updates the table."""
+        if self.player_table is None:
+            self.player_table = PlayerTable(self.map.graph)
+            for player in self.players.values():
+                self.player_table.add(player)
+        return self.player_table
+
+    def _add_player(self, player):
+        """Register a player and its room occupancy, replacing any previous one with the same id"""
+        previous = self.players.get(player.player_id)
+        if previous is not None:
+            previous.leave()
+            if self.player_table is not None:
+                self.player_table.remove(previous)
+        self.players[player.player_id] = player
+        player.place()
+        if self.player_table is not None:
+            self.player_table.add(player)
+
+    def remove_player(self, player):
+        """Forget a player and stop its outbound writer (no-op if it was replaced)"""
+        if self.players.get(player.player_id) is player:
+            del self.players[player.player_id]
+            player.leave()
+            if self.player_table is not None:
+                self.player_table.remove(player)
+            self.dirty.discard(player)
+        self.fanout.unregister(player.player_id, player.websocket)
+        self.touch()
+
+    def on_connection_closed(self, player_id, websocket):
+        """Fan-out callback for clients whose sends failed or overflowed"""
+        player = self.players.get(player_id)
+        if player is not None and player.websocket is websocket:
+            del self.players[player_id]
+            player.leave()
+            if self.player_table is not None:
+                self.player_table.remove(player)
+        asyncio.get_running_loop().create_task(self._close_websocket(websocket))
+
+    async def _close_websocket(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
-    async def handle_action(self, player, data):
-        """Process player action"""
+    async def handle_action(self, player, data, pending_rooms=None):
+        """Process player action. With pending_rooms (a set), rooms that need a
+        broadcast are added to it instead, so the caller can batch them."""
+        started = time.perf_counter()
         action_type = data.get("type")
-        print(f"[ACTION] {player.name}: {action_type}")
+        logger.debug("[ACTION] %s: %s", player.name, action_type)
+        self.touch()
+        player.last_action = time.time()
         
         try:
             if action_type == "move":
                 room_name = data.get("room")
-                print(f"[ACTION] {player.name} moving to {room_name}")
+                logger.debug("[ACTION] %s moving to %s", player.name, room_name)
                 if player.move_to(room_name):
                     event = {
                         "type": "player_moved",
@@ -102,16 +332,16 @@ class GameEngine:
                         "room": player.get_room_name()
                     }
                     self.event_engine.add_event(event)
-                    await self.broadcast_room_events(player.get_room_name())
-                    print(f"[ACTION] {player.name} moved successfully")
+                    await self._room_changed(player.get_room_name(), pending_rooms)
+                    logger.debug("[ACTION] %s moved successfully", player.name)
                 else:
-                    print(f"[ACTION] {player.name} move failed - not connected")
+                    logger.debug("[ACTION] %s move failed - not connected", player.name)
                     
             elif action_type == "chat":
                 message = data.get("message", "")
                 whisper = data.get("whisper", False)
                 target = data.get("target", None)
-                print(f"[ACTION] {player.name} chat: {message[:30]}...")
+                logger.debug("[ACTION] %s chat (%d chars)", player.name, len(message))
                 
                 chat_event = {
                     "type": "chat" if not whisper else "whisper",
@@ -123,21 +353,21 @@ class GameEngine:
                 
                 if whisper and target:
                     if target in self.players and self.players[target].get_room_name() == player.get_room_name():
-                        try:
-                            await self.players[target].websocket.send_json({
-                                "type": "chat",
-                                "player": player.name,
-                                "message": f"*whispers* {message}"
-                            })
-                        except Exception:
-                            pass
+                        self.fanout.send(target, {
+                            "type": "chat",
+                            "player": player.name,
+                            "message": f"*whispers* {message}"
+                        })
                 else:
-                    await self.broadcast_room_events(player.get_room_name())
+                    await self._room_changed(
+                        player.get_room_name(), pending_rooms,
+                        immediate=chat_event["type"] in self.IMMEDIATE_EVENT_TYPES
+                    )
                     
             elif action_type == "ability":
                 ability_name = data.get("ability")
                 target = data.get("target")
-                print(f"[ACTION] {player.name} ability: {ability_name}")
+                logger.debug("[ACTION] %s ability: %s", player.name, ability_name)
                 event = {
                     "type": "ability_used",
                     "player": player.name,
@@ -146,71 +376,153 @@ class GameEngine:
                     "room": player.get_room_name()
                 }
                 self.event_engine.add_event(event)
-                await self.broadcast_room_events(player.get_room_name())
+                await self._room_changed(player.get_room_name(), pending_rooms)
+            
+            elif action_type == "resync":
+                since_seq = int(data.get("since", 0) or 0)
+                logger.debug("[ACTION] %s resync from seq %d", player.name, since_seq)
+                await self.resync_player(player, since_seq)
             else:
-                print(f"[ACTION] Unknown action type: {action_type}")
-        except Exception as e:
-            print(f"[ACTION] Error handling {action_type} for {player.name}: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+                logger.debug("[ACTION] Unknown action type: %s", action_type)
+        except Exception:
+            logger.exception("[ACTION] Error handling %s for %s", action_type, player.name)
+        ACTION_SECONDS.observe(time.perf_counter() - started, action_type if action_type in ACTION_TYPES else "other")
+
+    async def _room_changed(self, room_name, pending_rooms, immediate=False):
+        if immediate:
+            await self.broadcast_room_events(room_name, immediate=True)
+        elif pending_rooms is None:
+            await self.broadcast_room_events(room_name)
+        else:
+            pending_rooms.add(room_name)
 
     async def broadcast(self, message, exclude=None):
-        """Send message to all connected players"""
-        for player_id, player in list(self.players.items()):
-            if exclude and player_id == exclude:
-                continue
-            try:
-                await player.websocket.send_json(message)
-            except Exception as e:
-                print(f"[BROADCAST] Error to {player.name}: {type(e).__name__}")
-                if player_id in self.players:
-                    del self.players[player_id]
+        """Queue message for all connected players"""
+        self.fanout.broadcast([pid for pid in self.players if pid != exclude], message)
 
-    async def broadcast_room_events(self, room_name):
-        """Send room-specific events to players in that room"""
-        for player_id, player in list(self.players.items()):
+    async def broadcast_room_events(self, room_name, immediate=False):
+        """Queue for each player in the room the events they have not received yet
+        (at the next flush, or right away with immediate=True)"""
+        room = self.rooms.get(room_name)
+        if room is not None:
+            if immediate:
+                self._deliver_pending(list(room.occupants))
+            else:
+                self.schedule_delivery(room.occupants)
+
+    def hearing_rooms(self, event):
+        """Rooms within hearing distance of an event's room"""
+        room_name = event.get("room")
+        return self.map.graph.rooms_within(room_name, event.get("volume", 1)) or (room_name,)
+
+    def broadcast_rooms(self, room_names):
+        """One delivery pass for everyone in room_names (used to batch AI ticks)"""
+        recipients = set()
+        for name in room_names:
+            room = self.rooms.get(name)
+            if room is not None:
+                recipients.update(room.occupants)
+        self.schedule_delivery(recipients)
+
+    def schedule_delivery(self, recipients):
+        """Mark recipients for the next flush. Everything that happens within one
+        flush interval reaches each player as a single frame; since delivery
+        follows each player's seq cursor, no event is sent twice."""
+        if self.flush_interval <= 0:
+            self._deliver_pending(recipients)
+            return
+        self.dirty.update(recipients)
+        if self.flush_handle is None:
             try:
-                if player.get_room_name() == room_name:
-                    filtered = self.event_engine.filter_events_for_player(player)
-                    if filtered:
-                        await player.websocket.send_json({
-                            "type": "events",
-                            "events": filtered
-                        })
-            except Exception as e:
-                print(f"[BROADCAST_ROOM] Error to {player.name}: {type(e).__name__}")
-                if player_id in self.players:
-                    del self.players[player_id]
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()  # No loop to wait on
+                return
+            self.flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Deliver pending events to every player marked since the last flush"""
+        self.flush_handle = None
+        recipients, self.dirty = self.dirty, set()
+        if recipients:
+            self._deliver_pending(recipients)
 
-    async def trigger_ai_events(self):
-        """Periodically trigger AI events"""
-        while True:
+    def _deliver_pending(self, recipients):
+        """Queue each recipient's undelivered visible events.
+        Players with identical deltas share one encoded frame."""
+        started = time.perf_counter()
+        groups = {}  # (truncated, tuple of event seqs) -> (events, player ids)
+        for player in recipients:
+            if player.is_ai:
+                continue  # AI players don't receive messages
             try:
-                await asyncio.sleep(10)  # AI event every 10 seconds
-                print("[AI] trigger_ai_events loop awake")
-                if len(self.players) > 0:
-                    ai_events = self.ai_engine.generate_events(self.players, self.map, self.difficulty)
-                    print(f"[AI] Generated {len(ai_events)} event(s)")
-                    for event in ai_events:
-                        self.event_engine.add_event(event)
-                        room = event.get("room")
-                        if room:
-                            await self.broadcast_room_events(room)
-                
-                # Also control AI players
-                await self.control_ai_players()
+                truncated = self.event_engine.is_truncated(player.last_seq)
+                filtered = self.event_engine.pull_events_for_player(player)
+                if filtered or truncated:
+                    key = (truncated, tuple(e["seq"] for e in filtered))
+                    groups.setdefault(key, (filtered, []))[1].append(player.player_id)
             except Exception as e:
-                print(f"Error generating AI events: {e}")
-                await asyncio.sleep(1)  # Don't loop too fast on error
-    
-    async def control_ai_players(self):
-        """Control AI players' actions (movement, chat, etc)"""
-        ai_players = [p for p in self.players.values() if hasattr(p, 'is_ai') and p.is_ai]
+                logger.warning("[BROADCAST_ROOM] Error for %s: %s", player.name, type(e).__name__)
         
-        for ai_player in ai_players:
-            actions = self.get_ai_actions(ai_player)
-            for action in actions:
-                await self.handle_action(ai_player, action)
+        for (truncated, _), (filtered, player_ids) in groups.items():
+            self.fanout.broadcast(player_ids, self._events_frame(filtered, self.event_engine.last_seq, truncated))
+        BROADCAST_SECONDS.observe(time.perf_counter() - started)
+
+    async def resync_player(self, player, since_seq=0):
+        """Resend visible events after since_seq, e.g. for a reconnecting client"""
+        truncated = self.event_engine.is_truncated(max(0, min(since_seq, self.event_engine.last_seq)))
+        filtered = self.event_engine.resync_player(player, since_seq)
+        frame = self._events_frame(filtered, player.last_seq, truncated)
+        frame["resync"] = True
+        self.fanout.send(player.player_id, frame)
+
+    def _events_frame(self, events, seq, truncated=False):
+        """Events message; when the player's cursor predates the buffer it is marked
+        truncated, with first_seq, so the client can page the gap from /game/event-log"""
+        frame = {"type": "events", "events": events, "seq": seq}
+        if truncated:
+            frame["truncated"] = True
+            frame["first_seq"] = self.event_engine.events.first_seq
+        return frame
+
+    def ai_world_tick(self, pending_rooms):
+        """Generate this tick's AI events; rooms that can hear them go into pending_rooms"""
+        ai_events = self.ai_engine.generate_events(
+            self.players, self.map, self.difficulty, genre=self.story.get("genre", "mystery"), story=bool(self.story)
+        )
+        for event in ai_events:
+            self.event_engine.add_event(event)
+            if event.get("room"):
+                pending_rooms.update(self.hearing_rooms(event))
+        return len(ai_events)
+    
+    def ai_players_tick(self, players, pending_rooms):
+        """Move and chat for a batch of AI players in one pass; rooms with new
+        events go into pending_rooms for a single broadcast"""
+        graph = self.map.graph
+        players = [p for p in players if p.current_room in graph.ids]
+        moves, chats = self.ai_controller.decide([graph.ids[p.current_room] for p in players])
+        now = time.time()
+        for index, room_id in moves:
+            player = players[index]
+            room_name = graph.names[room_id]
+            player.set_room(room_name)
+            player.history.append(room_name)
+            player.last_action = now
+            self.event_engine.add_event({"type": "player_moved", "player": player.name, "room": room_name})
+            pending_rooms.add(room_name)
+        for index, line in chats:
+            player = players[index]
+            player.last_action = now
+            self.event_engine.add_event({
+                "type": "chat",
+                "player": player.name,
+                "message": AI_CHATS[line],
+                "room": player.current_room
+            })
+            pending_rooms.add(player.current_room)
+        if moves or chats:
+            logger.debug("[AI] %d AI player(s): %d move(s), %d chat(s)", len(players), len(moves), len(chats))
     
     def assign_roles(self):
         """Assign roles to players in Game Mode"""
@@ -232,36 +544,15 @@ class GameEngine:
         class FakeWebSocket:
             async def send_json(self, data):
                 pass  # AI players don't need to receive messages
+            async def send_text(self, data):
+                pass
             async def receive_json(self):
                 return {}
         
         player = Player(name, FakeWebSocket(), self.map)
         player.is_ai = True
-        self.players[name] = player
+        self._add_player(player)
+        if self.scheduler is not None:
+            self.scheduler.add_player(self, player)
         print(f"[AI] Added AI player: {name} in {player.current_room}")
         return player
-
-    def get_ai_actions(self, player):
-        """Generate random AI player actions"""
-        actions = []
-        
-        # 30% chance to move
-        if random.random() < 0.3:
-            connected = list(self.map.rooms[player.current_room].connections) if hasattr(self.map.rooms[player.current_room], 'connections') else []
-            if connected:
-                room_names = [r.name if hasattr(r, 'name') else str(r) for r in connected]
-                room = random.choice(room_names)
-                actions.append({"type": "move", "room": room})
-        
-        # 20% chance to chat
-        if random.random() < 0.2:
-            chats = [
-                "I'm looking for something...",
-                "Did you see that?",
-                "It's quiet here...",
-                "What's going on?",
-                "I sense something nearby..."
-            ]
-            actions.append({"type": "chat", "message": random.choice(chats)})
-        
-        return actions
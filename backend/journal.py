@@ -0,0 +1,176 @@
+import bisect
+import json
+import os
+import re
+import struct
+import threading
+from collections import deque
+from pathlib import Path
+from backend.encoding import encode_json
+
+RECORD_HEADER = struct.Struct(">I")  # Length prefix of each journal record
+INDEX_STRIDE = 256  # Records between entries of the sparse seq -> offset index
+
+
+class EventJournal:
+    """Append-only, length-prefixed event journal plus a compact snapshot for one session.
+
+    Every event is appended as it is added, so saving costs O(new events).
+    A session is restored by loading the snapshot and replaying the journal.
+    A sparse index (the seq and offset of every INDEX_STRIDE-th record) lets
+    reads from a seq cursor seek close to it instead of scanning from the start.
+    """
+
+    def __init__(self, session_id, journal_dir="data/journal", replay_window=1000):
+        self.session_id = session_id
+        self.dir = Path(journal_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path, self.snapshot_path = self.paths_for(session_id, journal_dir)
+        self.last_seq = 0  # Newest seq written to the journal
+        self.snapshot_seq = 0  # Journal seq covered by the last snapshot
+        # Byte offsets of the newest records, so a restore can skip everything
+        # older than the in-memory event buffer would keep
+        self.offsets = deque(maxlen=replay_window)
+        self.records = 0  # Records in the journal file
+        self.index_seqs = []  # Seq of every INDEX_STRIDE-th record
+        self.index_offsets = []  # ... and its byte offset
+        self.snapshot_lock = threading.Lock()  # Snapshots are written from worker threads
+        self._truncate_torn_tail()
+        self.file = open(self.path, "ab")
+
+    @staticmethod
+    def paths_for(session_id, journal_dir="data/journal"):
+        """Journal and snapshot paths of a session"""
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        return Path(journal_dir) / f"{safe_id}.journal", Path(journal_dir) / f"{safe_id}.snapshot.json"
+
+    @classmethod
+    def persisted(cls, session_id, journal_dir="data/journal"):
+        """Whether a journal or snapshot was written for session_id (without creating one)"""
+        return any(path.exists() for path in cls.paths_for(session_id, journal_dir))
+
+    def _truncate_torn_tail(self):
+        """Drop a partially written last record left behind by a crash
+        (and build the sparse index while walking the records)"""
+        if not self.path.exists():
+            return
+        size = self.path.stat().st_size
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length = RECORD_HEADER.unpack(header)[0]
+                end = valid_end + RECORD_HEADER.size + length
+                if end > size:
+                    break
+                if self.records % INDEX_STRIDE == 0:
+                    self._index(json.loads(f.read(length)).get("seq", 0), valid_end)
+                f.seek(end)
+                valid_end = end
+                self.records += 1
+        if valid_end < size:
+            print(f"[JOURNAL] Truncating torn record at {valid_end} in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+    def append(self, event):
+        """Append one event (buffered; see flush)"""
+        payload = encode_json(event).encode("utf-8")
+        offset = self.file.tell()
+        self.offsets.append(offset)
+        self.file.write(RECORD_HEADER.pack(len(payload)) + payload)
+        self.last_seq = event.get("seq", self.last_seq)
+        if self.records % INDEX_STRIDE == 0:
+            self._index(self.last_seq, offset)
+        self.records += 1
+
+    def _index(self, seq, offset):
+        self.index_seqs.append(seq)
+        self.index_offsets.append(offset)
+
+    def offset_for(self, after_seq):
+        """Offset of a record boundary at or before the first record with
+        seq > after_seq (from the sparse index)"""
+        position = bisect.bisect_right(self.index_seqs, after_seq) - 1
+        return self.index_offsets[position] if position >= 0 else 0
+
+    def flush(self, fsync=False):
+        """Push buffered records to the OS (and to disk with fsync=True)"""
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def read(self, after_seq=0, offset=None, track_offsets=False):
+        """Yield journaled events with seq > after_seq, one at a time,
+        starting at byte offset (a record boundary; by default found from the
+        sparse index). With track_offsets the records read are remembered as
+        the replay window (used on restore)."""
+        self.file.flush()
+        if offset is None:
+            offset = self.offset_for(after_seq)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                position = f.tell()
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                payload = f.read(RECORD_HEADER.unpack(header)[0])
+                event = json.loads(payload)
+                if track_offsets:
+                    self.offsets.append(position)
+                    self.last_seq = event.get("seq", self.last_seq)
+                if event.get("seq", 0) > after_seq:
+                    yield event
+
+    def read_raw(self, after_seq=0):
+        """Yield the JSON text of journaled events with seq > after_seq. Seqs
+        only grow, so records are decoded only until the first match."""
+        self.file.flush()
+        matched = after_seq <= 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset_for(after_seq))
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                payload = f.read(RECORD_HEADER.unpack(header)[0]).decode("utf-8")
+                if not matched:
+                    matched = json.loads(payload).get("seq", 0) > after_seq
+                if matched:
+                    yield payload
+
+    def write_snapshot(self, state):
+        """Flush the journal and atomically replace the snapshot with state.
+        Concurrent writers (the snapshot loop, /game/save-session) take turns."""
+        with self.snapshot_lock:
+            self.flush(fsync=True)
+            state = {
+                **state,
+                "journal_seq": self.last_seq,
+                "replay_offset": self.offsets[0] if self.offsets else self.file.tell()
+            }
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.snapshot_path)
+            self.snapshot_seq = self.last_seq
+
+    def load_snapshot(self):
+        """Last snapshot, or None"""
+        try:
+            with open(self.snapshot_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def exists(self):
+        """Whether anything was persisted for this session before"""
+        return self.snapshot_path.exists() or (self.path.exists() and self.path.stat().st_size > 0)
+
+    def close(self):
+        with self.snapshot_lock:
+            self.flush(fsync=True)
+            self.file.close()
@@ -1,8 +1,19 @@
-from fastapi import FastAPI, WebSocket, Query
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import asyncio
-from backend.game_engine import GameEngine
+import base64
+import itertools
+import json
+import logging
+from backend.sessions import DEFAULT_SESSION, SessionManager, UnknownSession
+from backend.cluster import CALL_TIMEOUT, ClusterRouter, RemoteError, WorkerTimeout, WorkerUnavailable
+from backend.persistence import AsyncDatabase
+from backend.pdf_export import PdfJobs
+from backend.encoding import encode_json, negotiate_protocol
+from backend.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -13,7 +24,22 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-engine = GameEngine()
+sessions = SessionManager()
+router = ClusterRouter.from_env(sessions)  # None unless started via backend.cluster
+store = AsyncDatabase()  # Database access off the event loop
+pdf_jobs = PdfJobs(prefix=f"{router.worker_id}-" if router else "")  # PDF exports in a worker process
+
+# Gauges for /metrics, read at scrape time
+REGISTRY.gauge("isg_sessions", "Sessions hosted by this worker", lambda: len(sessions.sessions))
+REGISTRY.gauge("isg_players", "Players (human and AI) across sessions", sessions.player_count)
+REGISTRY.gauge("isg_connections", "Open websocket connections", lambda: sessions.fanout_metrics().get("connections", 0))
+REGISTRY.gauge("isg_buffered_events", "Events held in the sessions' event buffers",
+               lambda: sum(len(e.event_engine.events) for e in sessions.sessions.values()))
+REGISTRY.gauge("isg_send_queue_depth", "Frames waiting in outbound send queues",
+               lambda: sessions.fanout_metrics().get("queued", 0))
+REGISTRY.gauge("isg_send_queue_max_depth", "Deepest outbound send queue",
+               lambda: sessions.fanout_metrics().get("max_queue_depth", 0))
+REGISTRY.gauge("isg_ai_scheduled_ticks", "AI ticks waiting in the scheduler", lambda: len(sessions.scheduler.heap))
 
 # Serve frontend files
 app.mount("/frontend", StaticFiles(directory="frontend", html=True), name="frontend")
@@ -27,17 +53,83 @@ async def root():
 # Start AI event loop on startup
 @app.on_event("startup")
 async def startup_event():
-    # Enable AI events
-    asyncio.create_task(engine.trigger_ai_events())
+    # Enable AI events for every session and idle-session eviction
+    sessions.start()
     print("[STARTUP] AI event generation enabled")
+    if router:
+        await router.start()
+        print(f"[STARTUP] Cluster worker {router.worker_id} ready")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Commit any queued saves and session snapshots before exiting
+    await sessions.close()
+    await store.close()
+    pdf_jobs.close()
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "players": len(engine.players)}
+    return {
+        "status": "ok",
+        "players": sessions.player_count(),
+        "sessions": len(sessions.sessions),
+        "fanout": sessions.fanout_metrics(),
+        "ai_scheduler": sessions.scheduler.metrics(),
+        "narrative": sessions.narrator.metrics(),
+        "narrative_pools": sessions.narrative_pool_metrics()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Metrics in the Prometheus text format (per worker)"""
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Worker operations: endpoint bodies that must run on a particular worker, e.g.
+# room_code-scoped ones on the session's owner (see on_owner), so that other
+# workers never create the session or its journal
+
+WORKER_OPS = {}  # name -> async handler(**args) returning a JSON-able result
+OP_TIMEOUTS = {}  # name -> seconds another worker waits for the result
+if router:
+    router.methods = WORKER_OPS  # Callable from other workers over the bus
+
+def worker_op(name, timeout=CALL_TIMEOUT):
+    """Register an endpoint body as a worker operation"""
+    def register(handler):
+        WORKER_OPS[name] = handler
+        OP_TIMEOUTS[name] = timeout
+        return handler
+    return register
+
+async def on_owner(name, room_code, **args):
+    """Run a session operation here, or on the worker owning room_code"""
+    if router and not router.is_local(room_code):
+        return await router.call(router.owner(room_code), name, timeout=OP_TIMEOUTS[name], room_code=room_code, **args)
+    return await WORKER_OPS[name](room_code=room_code, **args)
+
+@app.exception_handler(WorkerUnavailable)
+async def worker_unavailable(request, exc):
+    """The session's worker is down (503) or too slow to answer (504)"""
+    from fastapi.responses import JSONResponse
+    status_code = 504 if isinstance(exc, WorkerTimeout) else 503
+    return JSONResponse({"error": f"The session's server did not respond: {exc}"}, status_code=status_code)
+
+@app.exception_handler(UnknownSession)
+@app.exception_handler(RemoteError)
+async def operation_failed(request, exc):
+    """Errors with a status code, raised here or by the owning worker"""
+    from fastapi.responses import JSONResponse
+    return JSONResponse({"error": str(exc)}, status_code=exc.status_code or 500)
 
 @app.get("/players")
-async def get_players():
+async def get_players(room_code: str = Query(None)):
     """Get list of connected players"""
+    return await on_owner("players", room_code)
+
+@worker_op("players")
+async def _players(room_code=None):
+    engine = await sessions.open(room_code)
     return {
         "players": [p.to_dict() for p in engine.players.values()],
         "count": len(engine.players),
@@ -46,8 +138,13 @@ async def get_players():
     }
 
 @app.post("/game/mode")
-async def set_game_mode(mode: str = Query("game"), difficulty: str = Query("normal"), ai_slots: int = Query(0)):
+async def set_game_mode(mode: str = Query("game"), difficulty: str = Query("normal"), ai_slots: int = Query(0), room_code: str = Query(None)):
     """Set game mode (story or game) and difficulty"""
+    return await on_owner("mode", room_code, mode=mode, difficulty=difficulty, ai_slots=ai_slots)
+
+@worker_op("mode")
+async def _set_game_mode(room_code=None, mode="game", difficulty="normal", ai_slots=0):
+    engine = await sessions.open(room_code)
     engine.set_game_mode(mode, difficulty, ai_slots)
     return {
         "mode": mode,
@@ -56,16 +153,26 @@ async def set_game_mode(mode: str = Query("game"), difficulty: str = Query("norm
     }
 
 @app.post("/game/assign-roles")
-async def assign_roles():
+async def assign_roles(room_code: str = Query(None)):
     """Assign roles to all players"""
+    return await on_owner("assign_roles", room_code)
+
+@worker_op("assign_roles")
+async def _assign_roles(room_code=None):
+    engine = await sessions.open(room_code)
     engine.assign_roles()
     return {
         "players": [p.to_dict() for p in engine.players.values()]
     }
 
 @app.post("/game/start")
-async def start_game():
+async def start_game(room_code: str = Query(None)):
     """Start the game"""
+    return await on_owner("start", room_code)
+
+@worker_op("start")
+async def _start_game(room_code=None):
+    engine = await sessions.open(room_code)
     engine.started = True
     return {
         "status": "Game started",
@@ -75,51 +182,53 @@ async def start_game():
 
 @app.websocket("/ws/{player_id}")
 async def websocket_endpoint(websocket: WebSocket, player_id: str):
-    await websocket.accept()
-    print(f"[ENDPOINT] WebSocket accepted for {player_id}")
-
     # Detect optional room/room_code from query params (for story sessions)
     params = websocket.query_params
     room_code = params.get("room") or params.get("room_code")
 
-    # Create player (pass room_code if present)
-    player = engine.setup_player(websocket, player_id, room_code=room_code)
-    print(f"[ENDPOINT] Player created: {player.name}")
-
-    # include total players and player index in welcome for proper client numbering
-    player_list = list(engine.players.keys())
-    player_index = player_list.index(player.player_id) + 1 if player.player_id in player_list else 1
-    welcome_msg = {
-        "type": "welcome",
-        "message": f"Welcome {player_id}!",
-        "mode": engine.mode,
-        "difficulty": engine.difficulty,
-        "player": player.to_dict(),
-        "total_players": len(engine.players),
-        "player_index": player_index,
-        "room_code": room_code
-    }
-    await websocket.send_json(welcome_msg)
-    print(f"[ENDPOINT] Welcome sent to {player_id} (index {player_index})")
+    # Sessions owned by another worker are relayed over the cluster bus (JSON only)
+    if router and not router.is_local(room_code):
+        await websocket.accept()
+        await router.relay(websocket, player_id, room_code, dict(params))
+        return
+
+    # Wire protocol: JSON text frames, or MessagePack binary frames when requested
+    protocol, subprotocol = negotiate_protocol(params.get("protocol"), websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    logger.debug("[ENDPOINT] WebSocket accepted for %s (%s)", player_id, protocol)
+
+    # Create player, queue the welcome and (with ?since=<seq>) replay missed events
+    engine = await sessions.get_or_create(room_code)
+    player = await engine.join(websocket, player_id, room_code=room_code, since=params.get("since"), protocol=protocol)
+    logger.debug("[ENDPOINT] Player created: %s", player.name)
     
     # Keep connection alive and listen for messages
     try:
         while True:
-            data = await websocket.receive_json()
-            print(f"[ENDPOINT] {player_id} action: {data.get('type')}")
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                data = engine.fanout.decode(message["bytes"])
+            else:
+                data = json.loads(message["text"])
             await engine.handle_action(player, data)
     except Exception as e:
-        print(f"[ENDPOINT] {player_id} disconnected: {type(e).__name__}")
+        logger.debug("[ENDPOINT] %s disconnected: %s", player_id, type(e).__name__)
     finally:
-        if player.player_id in engine.players:
-            del engine.players[player.player_id]
-        print(f"[ENDPOINT] {player_id} cleanup complete")
+        engine.remove_player(player)
+        logger.debug("[ENDPOINT] %s cleanup complete", player_id)
 
 # Additional Game Endpoints
 
 @app.post("/game/add-ai-players")
-async def add_ai_players(count: int = Query(1)):
+async def add_ai_players(count: int = Query(1), room_code: str = Query(None)):
     """Add AI players to the game (for Game Mode)"""
+    return await on_owner("add_ai_players", room_code, count=count)
+
+@worker_op("add_ai_players")
+async def _add_ai_players(room_code=None, count=1):
+    engine = await sessions.open(room_code)
     added = []
     for i in range(count):
         ai_name = f"AI_Player_{len(engine.players) + i + 1}"
@@ -128,8 +237,13 @@ async def add_ai_players(count: int = Query(1)):
     return {"added": added, "total_players": len(engine.players)}
 
 @app.post("/game/inject-event")
-async def inject_event(event_type: str = Query("ai_event"), room: str = Query("Hallway"), message: str = Query("")):
+async def inject_event(event_type: str = Query("ai_event"), room: str = Query("Hallway"), message: str = Query(""), room_code: str = Query(None)):
     """Inject a custom event into the game (spectator/GM feature)"""
+    return await on_owner("inject_event", room_code, event_type=event_type, room=room, message=message)
+
+@worker_op("inject_event")
+async def _inject_event(room_code=None, event_type="ai_event", room="Hallway", message=""):
+    engine = await sessions.open(room_code)
     event = {
         "type": event_type,
         "room": room,
@@ -141,69 +255,205 @@ async def inject_event(event_type: str = Query("ai_event"), room: str = Query("H
     return {"event": event, "status": "injected"}
 
 @app.get("/game/event-log")
-async def get_event_log(limit: int = Query(100)):
-    """Get the event log (for display/export)"""
-    from backend.utils import export_event_log
-    events = engine.event_engine.events[-limit:]
+async def get_event_log(limit: int = Query(100), after: int = Query(None), before: int = Query(None), room_code: str = Query(None)):
+    """Get a page of the event log. Without cursors: the newest `limit` events.
+    after=<seq> pages forward, before=<seq> pages back; older pages than the
+    in-memory buffer come from the session journal."""
+    return await on_owner("event_log", room_code, limit=limit, after=after, before=before)
+
+@worker_op("event_log")
+async def _event_log(room_code=None, limit=100, after=None, before=None):
+    engine = await sessions.open(room_code)
+    limit = max(1, min(limit, 1000))
+    if engine.journal:
+        events, source = await asyncio.to_thread(engine.event_page, after, before, limit)
+    else:
+        events, source = engine.event_page(after, before, limit)
     return {
         "total_events": len(engine.event_engine.events),
+        "first_seq": engine.event_engine.events.first_seq,
+        "last_seq": engine.event_engine.last_seq,
         "returned": len(events),
+        "source": source,
+        "next_after": events[-1]["seq"] if events else after,
+        "next_before": events[0]["seq"] if events else before,
         "events": events
     }
 
 @app.post("/game/export-log")
-async def export_log(format: str = Query("json")):
-    """Export event log in different formats"""
+async def export_log(format: str = Query("json"), room_code: str = Query(None)):
+    """Export the in-memory event log in different formats (see /game/export-log/stream for full history)"""
+    return await on_owner("export_log", room_code, format=format)
+
+@worker_op("export_log")
+async def _export_log(room_code=None, format="json"):
+    engine = await sessions.open(room_code)
     from backend.utils import export_event_log
-    exported = export_event_log(engine.event_engine.events, format=format)
+    exported = export_event_log(engine.event_engine.events.view(), format=format)
     return {
         "format": format,
         "content": exported,
         "timestamp": asyncio.get_event_loop().time()
     }
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json", "text": "text/plain"}
+EXPORT_PAGE = 1000  # Events per bus round trip when streaming another worker's session
+
+@app.get("/game/export-log/stream")
+async def stream_export_log(format: str = Query("ndjson"), source: str = Query("auto"), after: int = Query(0), room_code: str = Query(None)):
+    """Stream the event log as NDJSON, a JSON array or text, from memory or
+    from the session journal, one chunk at a time"""
+    from fastapi.responses import StreamingResponse
+    from backend.utils import iter_event_log
+    if format not in EXPORT_MEDIA_TYPES:
+        return {"error": f"Unknown format {format}; use one of {', '.join(EXPORT_MEDIA_TYPES)}"}
+    encoded = format != "text"
+    if router and not router.is_local(room_code):
+        # Pull the owner's events page by page; the first page is fetched here to surface errors
+        page = await on_owner("events_page", room_code, after=after, source=source, encoded=encoded, limit=EXPORT_PAGE)
+        if "error" in page:
+            return page
+        events = _owner_events(asyncio.get_running_loop(), room_code, page, source, encoded)
+    else:
+        engine = await sessions.open(room_code)
+        if source == "journal" and not engine.journal:
+            return {"error": "This session has no journal"}
+        events = engine.iter_events(after, source, encoded=encoded)
+    extension = "txt" if format == "text" else format
+    # A plain generator: Starlette iterates it in a worker thread, so journal reads stay off the loop
+    return StreamingResponse(
+        iter_event_log(events, format=format, encoded=encoded),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=event_log_{room_code or DEFAULT_SESSION}.{extension}"}
+    )
+
+def _owner_events(loop, room_code, page, source, encoded):
+    """Events of another worker's session, starting from an already fetched page.
+    Runs in Starlette's worker thread, so each further page blocks on the loop."""
+    while True:
+        yield from page["events"]
+        if not page["more"]:
+            return
+        page = asyncio.run_coroutine_threadsafe(
+            on_owner("events_page", room_code, after=page["after"], source=source, encoded=encoded, limit=EXPORT_PAGE),
+            loop
+        ).result()
+
+@worker_op("events_page", timeout=30.0)
+async def _events_page(room_code=None, after=0, source="auto", encoded=False, limit=EXPORT_PAGE):
+    """Up to limit events after the seq `after`, for streaming exports across workers"""
+    engine = await sessions.open(room_code)
+    if source == "journal" and not engine.journal:
+        return {"error": "This session has no journal"}
+    events = engine.iter_events(after, source)  # Bounds taken here on the loop; read in a thread
+    read = lambda: list(itertools.islice(events, limit + 1))
+    events = await asyncio.to_thread(read) if engine.journal else read()
+    more = len(events) > limit
+    events = events[:limit]
+    return {
+        "events": [encode_json(e) for e in events] if encoded else events,
+        "after": events[-1]["seq"] if events else after,
+        "more": more
+    }
+
+PDF_TIMEOUT = 120.0  # Seconds a worker waits for another worker's synchronous PDF export
+
+def _pdf_response(pdf_bytes):
+    from fastapi.responses import Response
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=game_session.pdf"}
+    )
+
 @app.get("/game/export-pdf")
-async def export_pdf():
-    """Export current game session as PDF"""
-    try:
-        from backend.utils import generate_story_pdf
-        
-        session_data = {
-            "mode": engine.mode,
-            "difficulty": engine.difficulty,
-            "players": [p.to_dict() for p in engine.players.values()],
-            "events": engine.event_engine.events,
-            "rooms": list(engine.rooms.keys())
-        }
-        
-        pdf_bytes = generate_story_pdf(session_data)
-        
-        from fastapi.responses import Response
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=game_session.pdf"}
-        )
-    except ImportError:
-        return {"error": "PDF export requires weasyprint. Install with: pip install weasyprint"}
-    except Exception as e:
-        return {"error": f"PDF generation failed: {str(e)}"}
+async def export_pdf(room_code: str = Query(None)):
+    """Export current game session as PDF (rendered off the event loop, cached per session and seq)"""
+    result = await on_owner("export_pdf", room_code)
+    if "error" in result:
+        return result
+    return _pdf_response(base64.b64decode(result["pdf"]))
+
+@worker_op("export_pdf", timeout=PDF_TIMEOUT)
+async def _export_pdf(room_code=None):
+    engine = await sessions.open(room_code)
+    job = await pdf_jobs.wait(pdf_jobs.submit(engine)["id"])
+    if job["status"] != "done":
+        if "weasyprint" in (job["error"] or ""):
+            return {"error": "PDF export requires weasyprint. Install with: pip install weasyprint"}
+        return {"error": f"PDF generation failed: {job['error']}"}
+    return {"pdf": base64.b64encode(pdf_jobs.result(job["id"])).decode("ascii")}  # JSON-able for the bus
+
+@app.post("/game/export-pdf/jobs")
+async def start_pdf_job(room_code: str = Query(None)):
+    """Start a background PDF export; poll its status, then fetch the result"""
+    return await on_owner("start_pdf_job", room_code)
+
+@worker_op("start_pdf_job")
+async def _start_pdf_job(room_code=None):
+    engine = await sessions.open(room_code)
+    return pdf_jobs.status(pdf_jobs.submit(engine)["id"])
+
+async def on_job_owner(name, job_id):
+    """Run a PDF job operation on the worker that runs the job (its id starts with "<worker>-")"""
+    worker, _, _ = job_id.partition("-")
+    if router and worker.isdigit() and int(worker) != router.worker_id:
+        return await router.call(int(worker), name, timeout=OP_TIMEOUTS[name], job_id=job_id)
+    return await WORKER_OPS[name](job_id=job_id)
+
+@worker_op("pdf_job")
+async def _pdf_job(job_id):
+    return pdf_jobs.status(job_id)
+
+@worker_op("pdf_job_result")
+async def _pdf_job_result(job_id):
+    pdf_bytes = pdf_jobs.result(job_id)
+    return base64.b64encode(pdf_bytes).decode("ascii") if pdf_bytes is not None else None
+
+@app.get("/game/export-pdf/jobs/{job_id}")
+async def pdf_job_status(job_id: str):
+    """Status of a PDF export job: running, done or failed"""
+    from fastapi.responses import JSONResponse
+    job = await on_job_owner("pdf_job", job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return job
+
+@app.get("/game/export-pdf/jobs/{job_id}/result")
+async def pdf_job_result(job_id: str):
+    """PDF of a finished export job"""
+    from fastapi.responses import JSONResponse
+    job = await on_job_owner("pdf_job", job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    if job["status"] != "done":
+        return JSONResponse(job, status_code=409)
+    pdf_data = await on_job_owner("pdf_job_result", job_id)
+    if pdf_data is None:
+        return JSONResponse({"error": "Result expired; start a new job"}, status_code=410)
+    return _pdf_response(base64.b64decode(pdf_data))
 
 @app.post("/game/save-session")
-async def save_session(session_name: str = Query("autosave")):
+async def save_session(session_name: str = Query("autosave"), room_code: str = Query(None)):
     """Save the current game session"""
-    from backend.db import Database
-    
+    return await on_owner("save_session", room_code, session_name=session_name)
+
+@worker_op("save_session")
+async def _save_session(room_code=None, session_name="autosave"):
+    engine = await sessions.open(room_code)
+    # Events are already in the session journal; only flush it and snapshot state
+    await engine.save_snapshot(force=True)
     session_data = {
         "name": session_name,
+        "room_code": engine.room_code,
         "mode": engine.mode,
         "difficulty": engine.difficulty,
         "players": [p.to_dict() for p in engine.players.values()],
-        "events": engine.event_engine.events
+        "last_seq": engine.event_engine.last_seq,
+        "journal": str(engine.journal.path) if engine.journal else None
     }
     
-    db = Database()
-    db.save_session(session_data)
+    await store.save_session(session_data)
     
     return {
         "status": "saved",
@@ -214,22 +464,16 @@ async def save_session(session_name: str = Query("autosave")):
 @app.get("/game/sessions")
 async def list_sessions():
     """List all saved game sessions"""
-    from backend.db import Database
-    
-    db = Database()
-    sessions = db.load_sessions()
+    saved = await store.load_sessions()
     
     return {
-        "total": len(sessions),
-        "sessions": sessions
+        "total": len(saved),
+        "sessions": saved
     }
 
 
-@app.post("/story/new")
-async def create_story(world: str = Query("default"), character: str = Query("Player"), genre: str = Query("mystery"), advanced: str = Query("")):
-    """Create a new story session and return a room code"""
+async def _create_story_session(world, character, genre, advanced):
     import random, string
-    from backend.db import Database
 
     room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
     session = {
@@ -240,49 +484,35 @@ async def create_story(world: str = Query("default"), character: str = Query("Pl
         "advanced": advanced,
         "created_at": asyncio.get_event_loop().time()
     }
-    db = Database()
-    sessions = db.load_sessions()
-    sessions[room_code] = session
-    db._write_json(db.sessions_file, sessions)
+    await store.save_session(session, session_id=room_code)
+    await on_owner("create_story", room_code, story=session)
 
     return {"room_code": room_code, "session": session}
 
 
+@worker_op("create_story")
+async def _create_story(room_code=None, story=None):
+    await sessions.get_or_create(room_code, story=story)
+
+@app.post("/story/new")
+async def create_story(world: str = Query("default"), character: str = Query("Player"), genre: str = Query("mystery"), advanced: str = Query("")):
+    """Create a new story session and return a room code"""
+    return await _create_story_session(world, character, genre, advanced)
+
+
 @app.get("/story/list")
 async def list_stories():
-    from backend.db import Database
-    db = Database()
-    sessions = db.load_sessions()
-    return {"total": len(sessions), "sessions": sessions}
+    saved = await store.load_sessions()
+    return {"total": len(saved), "sessions": saved}
 
 
 # Duplicate API under /api/story/* in case routing or proxies expect /api prefix
 @app.post("/api/story/new")
 async def api_create_story(world: str = Query("default"), character: str = Query("Player"), genre: str = Query("mystery"), advanced: str = Query("")):
-    import random, string
-    from backend.db import Database
-
-    room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    session = {
-        "room_code": room_code,
-        "world": world,
-        "character": character,
-        "genre": genre,
-        "advanced": advanced,
-        "created_at": asyncio.get_event_loop().time()
-    }
-    db = Database()
-    sessions = db.load_sessions()
-    sessions[room_code] = session
-    db._write_json(db.sessions_file, sessions)
-
-    return {"room_code": room_code, "session": session}
+    return await _create_story_session(world, character, genre, advanced)
 
 
 @app.get("/api/story/list")
 async def api_list_stories():
-    from backend.db import Database
-    db = Database()
-    sessions = db.load_sessions()
-    return {"total": len(sessions), "sessions": sessions}
-
+    saved = await store.load_sessions()
+    return {"total": len(saved), "sessions": saved}
@@ -1,12 +1,153 @@
+import math
+import random
+import sys
+from array import array
+from collections import deque
+
 class Room:
+    __slots__ = ("name", "connections", "occupants", "noise_level", "description", "items")
+    
     def __init__(self, name):
-        self.name = name
+        self.name = sys.intern(name)
         self.connections = []
-        self.occupants = []
+        self.occupants = set()  # Players currently in the room (kept by Player)
         self.noise_level = 0
         self.description = f"A {name.lower()}"
         self.items = []
 
+class RoomGraph:
+    """Room connections with integer room ids, CSR adjacency arrays and a
+    precomputed hop-distance table, built once per map.
+
+    Rooms are numbered in map order. Neighbors of room i are
+    neighbors[offsets[i]:offsets[i + 1]]. Distances are stored as unsigned
+    16-bit hop counts ("H" arrays; UNREACHABLE when no path exists), which
+    are exact because maps have fewer than UNREACHABLE rooms. All-pairs rows are computed up front
+    for maps up to max_matrix_rooms; larger maps compute rows on demand.
+    """
+    UNREACHABLE = 0xFFFF
+    DISTANCE_TYPECODE = "H"
+
+    def __init__(self, rooms, max_matrix_rooms=2048):
+        self.names = [sys.intern(name) for name in rooms]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.size = len(self.names)
+        self.offsets = array("i", [0])
+        self.neighbors = array("i")
+        for name in self.names:
+            for connected in rooms[name].connections:
+                self.neighbors.append(self.ids[connected.name])
+            self.offsets.append(len(self.neighbors))
+        self._build_tables(max_matrix_rooms)
+
+    @classmethod
+    def from_csr(cls, names, offsets, neighbors, max_matrix_rooms=2048):
+        """Graph from room names plus ready-made CSR adjacency arrays"""
+        graph = cls.__new__(cls)
+        graph.names = names
+        graph.ids = {name: i for i, name in enumerate(names)}
+        graph.size = len(names)
+        graph.offsets = offsets
+        graph.neighbors = neighbors
+        graph._build_tables(max_matrix_rooms)
+        return graph
+
+    def _build_tables(self, max_matrix_rooms):
+        if self.size >= self.UNREACHABLE:
+            raise ValueError(f"maps are limited to {self.UNREACHABLE - 1} rooms")
+        self.rows = {}  # room id -> distance row, for maps too big for the full table
+        self.matrix = None
+        if self.size <= max_matrix_rooms:
+            self.matrix = array(self.DISTANCE_TYPECODE, bytes(2 * self.size * self.size))
+            for room_id in range(self.size):
+                start = room_id * self.size
+                self.matrix[start:start + self.size] = self._bfs(room_id)
+        self.hearing = {}  # (room id, volume) -> frozenset of room names in range
+
+    def _bfs(self, source):
+        """Hop distances from source to every room"""
+        distances = array(self.DISTANCE_TYPECODE, [self.UNREACHABLE]) * self.size
+        distances[source] = 0
+        queue = deque([source])
+        offsets, neighbors = self.offsets, self.neighbors
+        while queue:
+            current = queue.popleft()
+            next_distance = distances[current] + 1  # < UNREACHABLE: a path has fewer hops than rooms
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = neighbors[i]
+                if distances[neighbor] == self.UNREACHABLE:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+        return distances
+
+    def distance_row(self, room_id):
+        """Distances from room_id to every room, indexed by room id"""
+        if self.matrix is not None:
+            start = room_id * self.size
+            return memoryview(self.matrix)[start:start + self.size]
+        row = self.rows.get(room_id)
+        if row is None:
+            if len(self.rows) >= 4096:
+                self.rows.clear()
+            row = self.rows[room_id] = self._bfs(room_id)
+        return row
+
+    def neighbor_ids(self, room_id):
+        """Ids of rooms connected to room_id"""
+        return self.neighbors[self.offsets[room_id]:self.offsets[room_id + 1]]
+
+    def distance(self, origin, target):
+        """Hop distance between two rooms by name, or None if unreachable/unknown"""
+        origin_id = self.ids.get(origin)
+        target_id = self.ids.get(target)
+        if origin_id is None or target_id is None:
+            return None
+        distance = self.distance_row(origin_id)[target_id]
+        return None if distance == self.UNREACHABLE else distance
+
+    def rooms_within(self, origin, radius):
+        """Names of rooms at most radius hops from origin (including origin)"""
+        origin_id = self.ids.get(origin)
+        if origin_id is None:
+            return frozenset()
+        key = (origin_id, radius)
+        rooms = self.hearing.get(key)
+        if rooms is None:
+            row = self.distance_row(origin_id)
+            rooms = frozenset(self.names[i] for i in range(self.size) if row[i] <= radius)
+            self.hearing[key] = rooms
+        return rooms
+
+
+class Map:
+    """Rooms by name plus their RoomGraph. Procedural maps remember the seed
+    they were generated from, so they can be regenerated instead of stored."""
+
+    def __init__(self, rooms, graph=None, seed=None):
+        self.rooms = rooms
+        self.graph = graph or RoomGraph(rooms)
+        self.seed = seed
+
+    def spec(self):
+        """Arguments that regenerate this map (None for hand-built maps)"""
+        if self.seed is None:
+            return None
+        return {"room_count": len(self.rooms), "seed": self.seed}
+
+
+MAP_SIZES = {"small": 12, "medium": 48, "large": 400, "huge": 20000}  # Presets for generate_ai_map
+PROCEDURAL_MATRIX_ROOMS = 256  # Above this, generated maps compute distance rows on demand (the full table is O(n^2) to build)
+ROOM_KINDS = [
+    "Library", "Kitchen", "Hallway", "Basement", "Attic", "Study", "Cellar", "Gallery",
+    "Chapel", "Workshop", "Armory", "Greenhouse", "Vault", "Parlor", "Observatory", "Crypt"
+]
+ROOM_MOODS = ["A dusty", "A dim", "A cold", "A cramped", "A grand", "A flooded", "A silent", "An abandoned"]
+ROOM_DETAILS = [
+    "with cobwebs in every corner", "lit by a flickering lamp", "smelling of old smoke",
+    "with scratches on the walls", "full of broken furniture", "with a draft from nowhere"
+]
+
+
 class MapGenerator:
     def generate_default_map(self):
         """Generate default house map"""
@@ -32,13 +173,62 @@ class MapGenerator:
         rooms["Basement"].connections = [rooms["Hallway"]]
         rooms["Attic"].connections = [rooms["Hallway"]]
         
-        # Create map object
-        map_obj = type("MapObj", (), {})()
-        map_obj.rooms = rooms
-        return map_obj
+        return Map(rooms)
     
-    def generate_ai_map(self, size="medium"):
-        """Generate AI-created map"""
-        # For now, return default map
-        # Can be enhanced to create procedural maps
-        return self.generate_default_map()
+    def generate_ai_map(self, size="medium", seed=None):
+        """Generate a procedural map. size is a preset name from MAP_SIZES or a room count."""
+        room_count = MAP_SIZES.get(size, size) if isinstance(size, str) else size
+        return self.generate_procedural_map(int(room_count), seed)
+    
+    def generate_procedural_map(self, room_count, seed=None, loop_chance=0.15):
+        """Generate a connected map of room_count rooms, deterministic per seed.
+
+        Rooms are laid out on a square grid, numbered row by row. Each room
+        after the first is joined to its left or upper neighbor (so every room
+        is reachable), and with probability loop_chance also to the other one.
+        Connections are built as integer ids in CSR arrays; Room objects get
+        theirs from the finished graph.
+        """
+        if room_count < 1:
+            raise ValueError("room_count must be at least 1")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        rng = random.Random(seed)
+        width = max(1, math.isqrt(room_count - 1) + 1)
+        
+        adjacency = [[] for _ in range(room_count)]
+        for room_id in range(1, room_count):
+            candidates = []
+            if room_id % width:
+                candidates.append(room_id - 1)
+            if room_id >= width:
+                candidates.append(room_id - width)
+            rng.shuffle(candidates)
+            linked = candidates[:1] if rng.random() >= loop_chance else candidates
+            for other in linked:
+                adjacency[room_id].append(other)
+                adjacency[other].append(room_id)
+        
+        offsets = array("i", [0])
+        neighbors = array("i")
+        for connected in adjacency:
+            neighbors.extend(connected)
+            offsets.append(len(neighbors))
+        
+        names = []
+        descriptions = []
+        for room_id in range(room_count):
+            kind = rng.choice(ROOM_KINDS)
+            names.append(sys.intern(f"{kind} {room_id + 1}"))
+            descriptions.append(f"{rng.choice(ROOM_MOODS)} {kind.lower()} {rng.choice(ROOM_DETAILS)}")
+        
+        graph = RoomGraph.from_csr(names, offsets, neighbors, max_matrix_rooms=PROCEDURAL_MATRIX_ROOMS)
+        rooms = {}
+        for name, description in zip(names, descriptions):
+            room = Room(name)
+            room.description = description
+            rooms[name] = room
+        room_list = list(rooms.values())
+        for room_id, room in enumerate(room_list):
+            room.connections = [room_list[i] for i in adjacency[room_id]]
+        return Map(rooms, graph=graph, seed=seed)
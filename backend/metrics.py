@@ -0,0 +1,142 @@
+"""In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Counters and histograms are recorded on the hot path, so recording is a dict
+lookup plus a bisect and a couple of list updates; everything else (cumulative
+buckets, formatting) happens when /metrics is scraped. Gauges are callbacks
+evaluated at scrape time. Each worker process keeps its own registry.
+"""
+import bisect
+
+# Seconds; game actions and fan-out passes usually take well under a millisecond
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, optionally split by label values"""
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {} if self.labels else {(): 0}  # label values -> count
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labels, labels), value
+
+
+class Histogram:
+    """Distribution of observed values (e.g. seconds) over fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [count per bucket..., count above the last bucket, sum]
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labels, labels, f'le="{_number(bound)}"'), cumulative
+            yield f"{self.name}_sum", _labels(self.labels, labels), series[-1]
+            yield f"{self.name}_count", _labels(self.labels, labels), cumulative
+
+
+class Gauge:
+    """Current value, read from collect() at scrape time. collect returns a
+    number, or a dict of label values (tuples) -> number."""
+    kind = "gauge"
+
+    def __init__(self, name, help, collect, labels=()):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labels = tuple(labels)
+
+    def samples(self):
+        value = self.collect()
+        if isinstance(value, dict):
+            for labels, v in value.items():
+                yield self.name, _labels(self.labels, labels), v
+        elif value is not None:
+            yield self.name, "", value
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}  # name -> metric
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, collect, labels=()):
+        return self._register(Gauge(name, help, collect, labels))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, labels, value in metric.samples():
+                    lines.append(f"{name}{labels} {_number(value)}")
+            except Exception as e:
+                print(f"[METRICS] Collecting {metric.name} failed: {type(e).__name__}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+ACTION_TYPES = frozenset(("move", "chat", "ability", "resync"))  # Other types are recorded as "other"
+ACTION_SECONDS = REGISTRY.histogram(
+    "isg_action_seconds", "Time to handle one player action, by action type", ("type",))
+BROADCAST_SECONDS = REGISTRY.histogram(
+    "isg_broadcast_seconds", "Time to filter and queue one event delivery pass for its recipients")
+SEND_FAILURES = REGISTRY.counter(
+    "isg_send_failures_total", "Websocket sends that failed or timed out (the client is dropped)")
+AI_TICK_SECONDS = REGISTRY.histogram(
+    "isg_ai_tick_seconds", "Time to run one session's due AI ticks and queue their broadcast")
@@ -0,0 +1,378 @@
+"""Narration for AI events and story beats.
+
+A NarrativeService sits in front of a pluggable provider (the offline stub,
+OpenAI, or plain templates). Requests from every session are batched,
+provider calls are limited in number and time, and results are cached by
+(kind, genre, room, difficulty, context hash). The game loop only uses
+narrate_nowait(), which returns a cached narration or a template straight
+away and warms the cache in the background.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from backend.ai_module import room_event_templates, narrative_templates
+
+
+def request_key(request):
+    """Cache key of a narration request"""
+    context = f"{request.get('setting') or ''}|{request.get('context', '')}"
+    context_hash = hashlib.md5(context.encode("utf-8")).hexdigest()[:16]
+    return (request["kind"], request["genre"], request["room"], request["difficulty"], context_hash)
+
+
+class NarrativeProvider:
+    """Turns a batch of narration requests into texts (same order).
+    A request is a dict with kind, genre, room, difficulty, context, subject
+    and setting (the story's world and advanced options, if any)."""
+    name = "base"
+
+    async def generate_batch(self, requests):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class TemplateProvider(NarrativeProvider):
+    """The built-in f-string templates; also the instant fallback of NarrativeService"""
+    name = "templates"
+
+    def generate(self, request):
+        if request["kind"] == "narrative":
+            return random.choice(narrative_templates(request.get("subject") or "Someone", request["difficulty"]))
+        return random.choice(room_event_templates(request["room"], request["difficulty"]))
+
+    async def generate_batch(self, requests):
+        return [self.generate(request) for request in requests]
+
+
+STUB_OPENINGS = {
+    "mystery": ["A clue glints", "Someone has been", "A locked drawer rattles", "Footprints lead"],
+    "horror": ["Something breathes", "A cold hand brushes", "The walls weep", "A scream is cut short"],
+    "fantasy": ["Runes flare", "A sprite darts", "An old spell hums", "Dragonfire flickers"],
+    "scifi": ["A console blinks", "The hull groans", "A drone whirs", "Static crackles"],
+}
+STUB_CLOSINGS = ["in {room}.", "somewhere in {room}...", "near {room}!", "through {room}."]
+
+
+class StubProvider(NarrativeProvider):
+    """Deterministic offline provider: the same request always gives the same
+    text. latency (seconds) simulates a slow remote model."""
+    name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, request):
+        digest = hashlib.md5(repr(request_key(request)).encode("utf-8")).digest()
+        openings = STUB_OPENINGS.get(request["genre"], STUB_OPENINGS["mystery"])
+        opening = openings[digest[0] % len(openings)]
+        closing = STUB_CLOSINGS[digest[1] % len(STUB_CLOSINGS)].format(room=request["room"])
+        if request["kind"] == "narrative" and request.get("subject"):
+            return f"{request['subject']} senses it: {opening.lower()} {closing}"
+        if request["difficulty"] == "hard":
+            return f"DANGER: {opening} {closing}"
+        return f"{opening} {closing}"
+
+    async def generate_batch(self, requests):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self.generate(request) for request in requests]
+
+
+class OpenAIProvider(NarrativeProvider):
+    """Narration from the OpenAI chat API: one completion per batch, answered
+    as a JSON array of lines. Needs the optional openai package."""
+    name = "openai"
+
+    def __init__(self, model="gpt-4o-mini", api_key=None):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise RuntimeError("The openai package is not installed")
+        self.client = AsyncOpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+        self.model = model
+
+    async def generate_batch(self, requests):
+        prompts = [
+            f"{i + 1}. {r['kind'].replace('_', ' ')} in a {r['genre']} story, room '{r['room']}', "
+            f"difficulty {r['difficulty']}" + (f", about {r['subject']}" if r.get("subject") else "")
+            + (f", setting: {r['setting']}" if r.get("setting") else "")
+            for i, r in enumerate(requests)
+        ]
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You narrate an interactive story game. For each numbered "
+                 "request write one atmospheric sentence under 20 words. Answer with a JSON array of strings only."},
+                {"role": "user", "content": "\n".join(prompts)}
+            ]
+        )
+        texts = json.loads(response.choices[0].message.content)
+        if not isinstance(texts, list) or len(texts) != len(requests):
+            raise ValueError(f"Expected {len(requests)} narrations, got {texts!r:.80}")
+        return [str(text) for text in texts]
+
+    async def close(self):
+        await self.client.close()
+
+
+class NarrativeCache:
+    """LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, max_entries=2048, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires at, text)
+
+    def get(self, key, now=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= (now or time.monotonic()):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, text, now=None):
+        self.entries[key] = ((now or time.monotonic()) + self.ttl, text)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class NarrativeService:
+    """Batched, cached, time-limited access to a NarrativeProvider.
+
+    Requests queued within batch_window seconds (up to max_batch) go to the
+    provider together, at most concurrency batches at a time, each limited
+    to timeout seconds. Identical requests in flight share one result.
+    """
+
+    def __init__(self, provider=None, max_batch=16, batch_window=0.02, concurrency=4, timeout=2.0, cache=None):
+        self.provider = provider or StubProvider()
+        self.templates = TemplateProvider()
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.cache = cache or NarrativeCache()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue = []  # (key, request, cache result) waiting for the next batch
+        self.inflight = {}  # key -> Future
+        self.batcher = None
+        self.stats = {"requests": 0, "cache_hits": 0, "fallbacks": 0, "timeouts": 0, "errors": 0, "batches": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Provider picked by ISG_NARRATIVE_PROVIDER: stub (default), openai or templates"""
+        choice = os.environ.get("ISG_NARRATIVE_PROVIDER", "stub")
+        if choice == "openai":
+            provider = OpenAIProvider(model=os.environ.get("ISG_NARRATIVE_MODEL", "gpt-4o-mini"))
+        elif choice == "templates":
+            provider = TemplateProvider()
+        else:
+            provider = StubProvider()
+        return cls(provider)
+
+    @staticmethod
+    def request(kind, genre, room, difficulty, context="", subject=None, setting=None):
+        return {
+            "kind": kind, "genre": genre or "mystery", "room": room,
+            "difficulty": difficulty, "context": context, "subject": subject, "setting": setting
+        }
+
+    async def narrate(self, kind, genre, room, difficulty, context="", subject=None, setting=None, timeout=None,
+                      cache=True, fallback=True):
+        """Narration for one request; a template (or None with fallback=False) if
+        the provider does not answer in time. With cache=False the cache is
+        neither read nor filled (for one-off texts such as pool refills)."""
+        request = self.request(kind, genre, room, difficulty, context, subject, setting)
+        key = request_key(request)
+        self.stats["requests"] += 1
+        if cache:
+            text = self.cache.get(key)
+            if text is not None:
+                self.stats["cache_hits"] += 1
+                return text
+        future = self._enqueue(key, request, cache)
+        try:
+            # Shielded: a late answer still lands in the cache for next time
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except Exception:
+            self.stats["fallbacks"] += 1
+            return self.templates.generate(request) if fallback else None
+
+    def narrate_nowait(self, kind, genre, room, difficulty, context="", subject=None):
+        """Cached narration, else a template now while the provider fills the cache"""
+        request = self.request(kind, genre, room, difficulty, context, subject)
+        key = request_key(request)
+        self.stats["requests"] += 1
+        text = self.cache.get(key)
+        if text is not None:
+            self.stats["cache_hits"] += 1
+            return text
+        try:
+            asyncio.get_running_loop()
+            self._enqueue(key, request)
+        except RuntimeError:
+            pass  # No loop (e.g. at import time): templates only
+        self.stats["fallbacks"] += 1
+        return self.templates.generate(request)
+
+    def _enqueue(self, key, request, cache=True):
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            self.queue.append((key, request, cache))
+            if self.batcher is None or self.batcher.done():
+                self.batcher = asyncio.create_task(self._batch_loop())
+        return future
+
+    async def _batch_loop(self):
+        """Cut the queue into batches and send each to the provider"""
+        while self.queue:
+            if len(self.queue) < self.max_batch:
+                await asyncio.sleep(self.batch_window)
+            batch, self.queue = self.queue[:self.max_batch], self.queue[self.max_batch:]
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        async with self.semaphore:
+            self.stats["batches"] += 1
+            try:
+                texts = await asyncio.wait_for(
+                    self.provider.generate_batch([request for _, request, _ in batch]), self.timeout
+                )
+                error = None
+            except asyncio.TimeoutError as e:
+                self.stats["timeouts"] += 1
+                error = e
+            except Exception as e:
+                print(f"[NARRATIVE] {self.provider.name} batch failed: {type(e).__name__}: {e}")
+                self.stats["errors"] += 1
+                error = e
+        for i, (key, _, cache) in enumerate(batch):
+            future = self.inflight.pop(key, None)
+            if error is None and cache:
+                self.cache.put(key, texts[i])
+            if future is not None and not future.done():
+                if error is None:
+                    future.set_result(texts[i])
+                else:
+                    future.set_exception(error)
+                    future.exception()  # Mark retrieved: callers may have given up already
+
+    async def close(self):
+        await self.provider.close()
+
+    def metrics(self):
+        return {"provider": self.provider.name, "cached": len(self.cache), "queued": len(self.queue), **self.stats}
+
+
+class NarrativePool:
+    """Pre-generated narration for one story session, refilled in the background.
+
+    Keeps a queue of room events (room, text) and one of narrative beats about
+    the story's character. When a queue drops below low_water a refill tops
+    it up to high_water through the NarrativeService, using the session's
+    genre, world and advanced settings. Refills bypass the shared cache (each
+    item is used once) and keep only provider texts, so template fallbacks
+    never count as pool hits. draw() is O(1) and returns None when the queue
+    is empty, so callers fall back to templates. Only kinds that are drawn are
+    prefetched: room events from the start (every world tick draws them),
+    anything else from its first draw on.
+    """
+
+    KINDS = ("room_event", "narrative")
+    PREFETCH_KINDS = ("room_event",)  # Refilled before their first draw
+
+    def __init__(self, service, engine, low_water=8, high_water=32):
+        self.service = service
+        self.engine = engine
+        self.low_water = low_water
+        self.high_water = high_water
+        self.queues = {kind: deque() for kind in self.KINDS}
+        self.refills = {}  # kind -> running refill task
+        self.active = set(self.PREFETCH_KINDS)  # Kinds kept topped up
+        self.counter = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.refill_count = 0
+        self.refill_failures = 0  # Refill requests the provider did not answer in time
+        self.refill_seconds = 0.0
+        self.last_refill_seconds = 0.0
+
+    def draw(self, kind):
+        """Next pre-generated item of kind, or None (room events are (room, text))"""
+        queue = self.queues[kind]
+        self.active.add(kind)
+        item = queue.popleft() if queue else None
+        if item is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if len(queue) < self.low_water:
+            self.start_refill(kind)
+        return item
+
+    def start_refill(self, kind=None):
+        """Top up one queue (or every active one) in the background; no-op without a running loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for kind in ([kind] if kind else sorted(self.active)):
+            task = self.refills.get(kind)
+            if task is None or task.done():
+                self.refills[kind] = asyncio.create_task(self.refill(kind))
+
+    async def refill(self, kind):
+        """Generate enough items to bring the queue of kind up to high_water"""
+        queue = self.queues[kind]
+        missing = self.high_water - len(queue)
+        if missing <= 0:
+            return
+        story = self.engine.story
+        setting = "; ".join(str(story[k]) for k in ("world", "advanced") if story.get(k))
+        subject = story.get("character") or "Player"
+        rooms = [self.engine.map.graph.names[random.randrange(self.engine.map.graph.size)] for _ in range(missing)]
+        started = time.perf_counter()
+        texts = await asyncio.gather(*[
+            self.service.narrate(
+                kind, story.get("genre"), room, self.engine.difficulty, context=str(next(self.counter)),
+                subject=subject if kind == "narrative" else None, setting=setting, cache=False, fallback=False
+            )
+            for room in rooms
+        ])
+        elapsed = time.perf_counter() - started
+        self.refill_count += 1
+        self.refill_seconds += elapsed
+        self.last_refill_seconds = elapsed
+        for room, text in zip(rooms, texts):
+            if text is None:
+                self.refill_failures += 1
+                continue
+            queue.append((room, text) if kind == "room_event" else text)
+
+    def metrics(self):
+        draws = self.hits + self.misses
+        return {
+            "sizes": {kind: len(queue) for kind, queue in self.queues.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / draws, 4) if draws else None,
+            "refills": self.refill_count,
+            "refill_failures": self.refill_failures,
+            "last_refill_seconds": round(self.last_refill_seconds, 6),
+            "avg_refill_seconds": round(self.refill_seconds / self.refill_count, 6) if self.refill_count else None
+        }
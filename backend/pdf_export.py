@@ -0,0 +1,181 @@
+"""PDF export of a game session, rendered in worker processes.
+
+HTML comes from one compiled Jinja2 template whose event log is emitted in
+sections of EVENT_CHUNK events; WeasyPrint (optional) turns it into a PDF.
+PdfJobs runs renders in a process pool as background jobs and caches the
+result per (session, last event seq), so exporting an unchanged session
+again is instant.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from jinja2 import Environment
+
+EVENT_CHUNK = 500  # Events per <section> of the event log
+
+STORY_TEMPLATE = Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True).from_string("""\
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1 { color: #333; border-bottom: 2px solid #333; }
+        h2 { color: #666; margin-top: 20px; }
+        .player { background: #f0f0f0; padding: 10px; margin: 5px 0; border-radius: 3px; }
+        .event { background: #e8f4f8; padding: 8px; margin: 3px 0; border-left: 3px solid #0099cc; }
+        .summary { color: #666; font-size: 12px; margin: 10px 0; }
+    </style>
+</head>
+<body>
+    <h1>Interactive Story Game Session</h1>
+    <div class="summary">
+        <p><strong>Mode:</strong> {{ mode }}</p>
+        <p><strong>Difficulty:</strong> {{ difficulty }}</p>
+        <p><strong>Total Events:</strong> {{ events|length }}</p>
+    </div>
+
+    <h2>Players</h2>
+{% for p in players %}
+    <div class="player"><strong>{{ p.name }}</strong> - Role: {{ p.role or "None" }} - Room: {{ p.current_room or "Unknown" }}</div>
+{% endfor %}
+
+    <h2>Event Log</h2>
+{% for chunk in events|batch(chunk_size) %}
+    <section>
+{% for e in chunk %}
+        <div class="event"><strong>{{ e.type }}</strong>: {{ e.player or "System" }} - {{ e.message or e.text or "event" }}</div>
+{% endfor %}
+    </section>
+{% endfor %}
+</body>
+</html>
+""")
+
+
+def render_story_html(session_data):
+    """HTML of a session export, built from the template's streamed chunks"""
+    return "".join(STORY_TEMPLATE.generate(
+        mode=session_data.get("mode", "unknown"),
+        difficulty=session_data.get("difficulty", "normal"),
+        players=session_data.get("players", []),
+        events=session_data.get("events", []),
+        chunk_size=EVENT_CHUNK
+    ))
+
+
+def render_story_pdf(session_data):
+    """PDF bytes of a session export (runs in a worker process)"""
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ImportError("weasyprint is required for PDF export. Install with: pip install weasyprint")
+    return HTML(string=render_story_html(session_data)).write_pdf()
+
+
+class PdfJobs:
+    """Background PDF renders in a process pool, with per-(session, seq) caching"""
+
+    def __init__(self, max_workers=1, cache_size=16, max_jobs=100, prefix=""):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.max_jobs = max_jobs
+        self.executor = None
+        self.cache = OrderedDict()  # (room code, last seq) -> PDF bytes
+        self.jobs = OrderedDict()  # job id -> job dict
+        self.running = {}  # (room code, last seq) -> job id
+        self.ids = itertools.count(1)
+        self.prefix = prefix  # Prepended to job ids (the worker id in a cluster)
+
+    def _executor(self):
+        if self.executor is None:
+            # spawn: the server process has threads (DB writer, bus) that fork would not copy safely
+            self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def _new_job(self, key, status):
+        job_id = f"{self.prefix}{next(self.ids)}"
+        self.jobs[job_id] = {
+            "id": job_id, "room_code": key[0], "last_seq": key[1], "status": status,
+            "error": None, "created": time.time(), "finished": None, "future": None
+        }
+        while len(self.jobs) > self.max_jobs:
+            old_id, old = next(iter(self.jobs.items()))
+            if old["status"] in ("queued", "running"):
+                break
+            del self.jobs[old_id]
+        return self.jobs[job_id]
+
+    def submit(self, engine):
+        """Start (or reuse) a render of engine's session; returns the job"""
+        key = (engine.room_code, engine.event_engine.last_seq)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            job = self._new_job(key, "done")
+            job["finished"] = job["created"]
+            return job
+        if key in self.running:
+            return self.jobs[self.running[key]]
+        session_data = {
+            "mode": engine.mode,
+            "difficulty": engine.difficulty,
+            "players": [p.to_dict() for p in engine.players.values()],
+            "events": list(engine.event_engine.events.view()),
+            "rooms": list(engine.rooms.keys())
+        }
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor(), render_story_pdf, session_data)
+        except BrokenProcessPool:
+            self.executor = None  # A worker died; start a fresh pool
+            future = loop.run_in_executor(self._executor(), render_story_pdf, session_data)
+        job = self._new_job(key, "running")
+        job["future"] = future
+        self.running[key] = job["id"]
+        future.add_done_callback(lambda future: self._finish(key, job, future))
+        return job
+
+    def _finish(self, key, job, future):
+        self.running.pop(key, None)
+        job["finished"] = time.time()
+        job["future"] = None
+        if future.cancelled():
+            job["status"], job["error"] = "failed", "cancelled"
+        elif future.exception() is not None:
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self.executor = None
+            job["status"], job["error"] = "failed", f"{type(error).__name__}: {error}"
+        else:
+            job["status"] = "done"
+            self.cache[key] = future.result()
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def status(self, job_id):
+        """Public view of a job, or None"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if k != "future"}
+
+    def result(self, job_id):
+        """PDF bytes of a finished job, or None"""
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "done":
+            return None
+        return self.cache.get((job["room_code"], job["last_seq"]))
+
+    async def wait(self, job_id):
+        """Wait for a job to finish and return its status"""
+        job = self.jobs.get(job_id)
+        if job is not None and job["future"] is not None:
+            await asyncio.wait([job["future"]])
+        return self.status(job_id)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,168 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from backend.db import Database
+
+_STOP = object()
+
+
+class AsyncDatabase:
+    """Awaitable front end for Database that keeps SQLite I/O off the event loop.
+
+    Writes go to a dedicated writer thread, which collects everything queued
+    within batch_window seconds and commits it as one transaction. Writes to
+    the same key (session id, player name, event list) coalesce, so only the
+    last one is written. Reads run on a small thread pool after pending writes
+    are flushed, so a read sees the writes queued before it.
+    """
+
+    def __init__(self, db_path="data", batch_window=0.05, read_workers=2):
+        self.db_path = db_path
+        self.batch_window = batch_window
+        self.read_workers = read_workers
+        self.db = None
+        self.queue = queue.Queue()
+        self.thread = None
+        self.readers = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.batches = 0
+        self.coalesced = 0
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.readers = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="db-read")
+                self.thread = threading.Thread(target=self._writer, name="db-writer", daemon=True)
+                self.thread.start()
+
+    def _database(self):
+        # Created lazily on a worker thread: opening it creates the schema
+        with self.lock:
+            if self.db is None:
+                self.db = Database(self.db_path)
+            return self.db
+
+    def _submit(self, key, method, args, result=None):
+        """Queue a write and return a future resolved once it is committed"""
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending += 1
+        self.queue.put((key, method, args, result, loop, future))
+        return future
+
+    def _writer(self):
+        """Writer thread: gather a batch, coalesce by key, commit, resolve futures"""
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        writes = {}  # key -> (method, args); later writes replace earlier ones
+        for key, method, args, _, _, _ in batch:
+            if method is None:
+                continue  # flush barrier
+            if key in writes:
+                self.coalesced += 1
+                del writes[key]  # keep commit order = order of the last write
+            writes[key] = (method, args)
+        error = None
+        try:
+            if writes:
+                self._database().write_batch(list(writes.values()))
+            self.batches += 1
+        except Exception as e:
+            print(f"[DB] Batch write failed: {type(e).__name__}: {e}")
+            error = e
+        for _, _, _, result, loop, future in batch:
+            loop.call_soon_threadsafe(self._resolve, future, result, error)
+
+    def _resolve(self, future, result, error):
+        self.pending -= 1
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def flush(self):
+        """Wait until every write queued so far is committed"""
+        if self.thread is None:
+            return
+        await self._submit(("flush",), None, None)
+
+    async def _read(self, method, *args):
+        if self.pending:
+            await self.flush()
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, lambda: getattr(self._database(), method)(*args))
+
+    # Writes (same names as Database; awaiting waits for the commit)
+
+    def save_player(self, player_data):
+        return self._submit(("player", player_data["name"]), "save_player", (player_data,))
+
+    def save_session(self, session_data, session_id=None):
+        session_id = session_id or session_data.get("id", str(datetime.now().timestamp()))
+        return self._submit(("session", session_id), "save_session", (session_data, session_id), result=session_id)
+
+    def save_events(self, events, session_id):
+        return self._submit(("events", session_id), "save_events", (list(events), session_id))
+
+    # Reads
+
+    async def load_players(self):
+        return await self._read("load_players")
+
+    async def get_player(self, player_name):
+        return await self._read("get_player", player_name)
+
+    async def load_sessions(self):
+        return await self._read("load_sessions")
+
+    async def get_session(self, session_id):
+        return await self._read("get_session", session_id)
+
+    async def find_sessions(self, room_code=None, name=None):
+        return await self._read("find_sessions", room_code, name)
+
+    async def get_events(self, session_id):
+        return await self._read("get_events", session_id)
+
+    async def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self.thread is None:
+            return
+        await self.flush()
+        self.queue.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+        self.readers.shutdown(wait=False)
+        self.thread = None
+
+    def metrics(self):
+        return {"pending": self.pending, "batches": self.batches, "coalesced": self.coalesced}
@@ -1,23 +1,74 @@
+import sys
 import time
 import json
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HISTORY_LIMIT = 50  # Most recent actions kept per player
+
 
 class Player:
+    __slots__ = (
+        "name", "websocket", "player_id", "current_room", "map", "_awareness", "_focus",
+        "role", "personal_objective", "abilities", "history", "is_ai", "connected_at",
+        "_last_action", "last_seq", "room_code", "table", "table_slot"
+    )
+    
     def __init__(self, name, websocket, map_obj):
         self.name = name
         self.websocket = websocket
         self.player_id = name
-        # Store room name as string, not object
-        self.current_room = list(map_obj.rooms.keys())[0]  # Start in first room (as string)
+        self.table = None  # Optional PlayerTable mirroring this player's state
+        self.table_slot = -1
+        # Store room name as string, not object; change it through set_room()
+        self.current_room = sys.intern(next(iter(map_obj.rooms)))  # Start in first room
         self.map = map_obj  # Keep reference to map for room lookups
         self.awareness = 5
         self.focus = "normal"
         self.role = None
         self.personal_objective = None
         self.abilities = []
-        self.history = []
+        self.history = deque(maxlen=HISTORY_LIMIT)
         self.is_ai = False
         self.connected_at = time.time()
         self.last_action = time.time()
+        self.last_seq = 0  # Sequence number of the last event delivered to this player
+        self.room_code = None
+    
+    @property
+    def awareness(self):
+        return self._awareness
+    
+    @awareness.setter
+    def awareness(self, value):
+        self._awareness = value
+        if self.table is not None:
+            self.table.awareness[self.table_slot] = value
+    
+    @property
+    def focus(self):
+        return self._focus
+    
+    @focus.setter
+    def focus(self, value):
+        self._focus = value
+        if self.table is not None:
+            self.table.focus[self.table_slot] = self.table.focus_code(value)
+    
+    @property
+    def last_action(self):
+        return self._last_action
+    
+    @last_action.setter
+    def last_action(self, value):
+        self._last_action = value
+        if self.table is not None:
+            self.table.last_action[self.table_slot] = value
         
     def move_to(self, room_name):
         """Move player to adjacent room"""
@@ -29,11 +80,32 @@ class Player:
         # Check if target is connected to current
         connected_names = [r.name for r in current_room_obj.connections]
         if room_name in connected_names:
-            self.current_room = room_name
+            self.set_room(room_name)
+            self.history.append(room_name)
             self.last_action = time.time()
             return True
         return False
 
+    def set_room(self, room_name):
+        """Put the player in room_name, keeping room occupancy in sync"""
+        self.leave()
+        self.current_room = sys.intern(room_name)
+        self.place()
+        if self.table is not None:
+            self.table.room_ids[self.table_slot] = self.table.graph.ids.get(room_name, -1)
+
+    def place(self):
+        """Register the player as an occupant of its current room"""
+        room = self.map.rooms.get(self.current_room)
+        if room is not None:
+            room.occupants.add(self)
+
+    def leave(self):
+        """Remove the player from its current room's occupants"""
+        room = self.map.rooms.get(self.current_room)
+        if room is not None:
+            room.occupants.discard(self)
+
     def get_connected_rooms(self):
         """Get names of connected rooms"""
         current_room_obj = self.map.rooms.get(self.current_room)
@@ -46,10 +118,16 @@ class Player:
         return self.current_room
     
     def can_hear_event(self, event_room, event_volume=1):
-        """Check if player can hear event based on awareness"""
+        """Check if player can hear event based on awareness and distance.
+        A sound carries at most event_volume rooms away."""
         if self.current_room == event_room:
             return True
-        return event_volume >= self.awareness
+        if event_volume < self.awareness:
+            return False
+        graph = getattr(self.map, "graph", None)
+        if graph is None:
+            return True
+        return self.current_room in graph.rooms_within(event_room, event_volume)
     
     def to_dict(self):
         """Serialize player for JSON"""
@@ -62,3 +140,95 @@ class Player:
             "focus": self.focus,
             "is_ai": self.is_ai
         }
+
+
+class PlayerTable:
+    """Struct-of-arrays copy of per-player state (room id, awareness, focus,
+    last action) for bulk queries over contiguous arrays.
+
+    Players attached with add() write their changes through to the table.
+    Freed slots are reused; a slot whose player is None is empty.
+    Queries are vectorized when NumPy is installed.
+    """
+    
+    def __init__(self, graph):
+        self.graph = graph
+        self.room_ids = array("i")
+        self.awareness = array("h")
+        self.focus = array("b")
+        self.last_action = array("d")
+        self.players = []  # slot -> Player or None
+        self.free = []
+        self.focus_codes = {}
+    
+    def focus_code(self, focus):
+        """Small integer code for a focus value"""
+        return self.focus_codes.setdefault(focus, len(self.focus_codes))
+    
+    def add(self, player):
+        """Attach player to a slot and copy its current state in"""
+        values = (
+            self.graph.ids.get(player.current_room, -1),
+            player.awareness,
+            self.focus_code(player.focus),
+            player.last_action
+        )
+        if self.free:
+            slot = self.free.pop()
+            self.players[slot] = player
+            self.room_ids[slot], self.awareness[slot], self.focus[slot], self.last_action[slot] = values
+        else:
+            slot = len(self.players)
+            self.players.append(player)
+            self.room_ids.append(values[0])
+            self.awareness.append(values[1])
+            self.focus.append(values[2])
+            self.last_action.append(values[3])
+        player.table = self
+        player.table_slot = slot
+        return slot
+    
+    def remove(self, player):
+        """Detach player and free its slot"""
+        if player.table is not self:
+            return
+        slot = player.table_slot
+        self.players[slot] = None
+        self.room_ids[slot] = -1
+        self.free.append(slot)
+        player.table = None
+        player.table_slot = -1
+    
+    def _select(self, mask_slots):
+        players = self.players
+        return [players[slot] for slot in mask_slots if players[slot] is not None]
+    
+    def idle_players(self, idle_seconds, now=None):
+        """Players whose last action is more than idle_seconds ago"""
+        cutoff = (now or time.time()) - idle_seconds
+        if np is not None and self.players:
+            last_action = np.frombuffer(self.last_action, dtype=np.float64)
+            room_ids = np.frombuffer(self.room_ids, dtype=np.int32)
+            return self._select(np.flatnonzero((last_action < cutoff) & (room_ids >= 0)).tolist())
+        return self._select(
+            slot for slot, last in enumerate(self.last_action)
+            if last < cutoff and self.room_ids[slot] >= 0
+        )
+    
+    def players_within(self, room_name, distance):
+        """Players at most distance hops from room_name"""
+        room_id = self.graph.ids.get(room_name)
+        if room_id is None:
+            return []
+        row = self.graph.distance_row(room_id)
+        if np is not None and self.players:
+            room_ids = np.frombuffer(self.room_ids, dtype=np.int32)
+            distances = np.frombuffer(row, dtype=np.uint16)
+            occupied = room_ids >= 0
+            hops = np.full(len(room_ids), self.graph.UNREACHABLE, dtype=np.uint16)
+            hops[occupied] = distances[room_ids[occupied]]
+            return self._select(np.flatnonzero(hops <= distance).tolist())
+        return self._select(
+            slot for slot, room in enumerate(self.room_ids)
+            if room >= 0 and row[room] <= distance
+        )
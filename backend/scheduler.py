@@ -0,0 +1,126 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from backend.metrics import AI_TICK_SECONDS
+
+WORLD = "world"  # Slot of a session's world (AI event) tick
+BOTS = "bots"  # Slot of a session's AI player tick, which decides for all its AI players
+
+
+class AIScheduler:
+    """Event-driven AI ticks for every session, kept in one heap.
+
+    Each session has a world tick (ambient AI events) and, once it has AI
+    players, one bot tick that moves all of them in a single batched decision,
+    at intervals set by the session's difficulty. First ticks are spread
+    uniformly over one interval and every reschedule is jittered, so sessions
+    do not line up. Sessions without connected humans are skipped, and ticks
+    that fall due together in one session share one broadcast pass.
+    """
+
+    def __init__(self, jitter=0.2, seed=None):
+        self.heap = []  # (due, counter, engine, WORLD or BOTS)
+        self.counter = itertools.count()
+        self.planned = set()  # (engine, WORLD or BOTS) with an entry in the heap
+        self.rng = random.Random(seed)
+        self.jitter = jitter
+        self.wakeup = None
+        self.ticks = 0
+        self.skipped = 0
+        self.last_batch_seconds = 0.0
+
+    def interval(self, engine, slot):
+        settings = engine.ai_engine.settings_for(engine.difficulty)
+        return settings["world_interval"] if slot == WORLD else settings["player_interval"]
+
+    def _push(self, due, engine, slot):
+        if self.wakeup is not None and (not self.heap or due < self.heap[0][0]):
+            self.wakeup.set()  # New earliest tick: let run() recompute its sleep
+        heapq.heappush(self.heap, (due, next(self.counter), engine, slot))
+
+    def _plan(self, engine, slot):
+        """Schedule a first tick at a random point within one interval"""
+        key = (engine, slot)
+        if key in self.planned:
+            return
+        self.planned.add(key)
+        self._push(time.monotonic() + self.rng.uniform(0, self.interval(engine, slot)), engine, slot)
+
+    def add_session(self, engine):
+        """Start ticking a session (and its AI players, if it has any)"""
+        engine.scheduler = self
+        self._plan(engine, WORLD)
+        if any(p.is_ai for p in engine.players.values()):
+            self._plan(engine, BOTS)
+
+    def add_player(self, engine, player):
+        """Make sure the session's bot tick is running for a new AI player"""
+        self._plan(engine, BOTS)
+
+    def remove_session(self, engine):
+        """Stop ticking a session (its heap entries are dropped when they come due)"""
+        if engine.scheduler is self:
+            engine.scheduler = None
+
+    def _is_live(self, engine, slot):
+        if engine.scheduler is not self:
+            return False
+        return slot == WORLD or any(p.is_ai for p in engine.players.values())
+
+    async def run(self):
+        """Sleep until the next tick is due, run everything due, repeat"""
+        self.wakeup = asyncio.Event()
+        while True:
+            delay = self.heap[0][0] - time.monotonic() if self.heap else None
+            if delay is None or delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_due(time.monotonic())
+
+    async def run_due(self, now):
+        """Run every tick due at now, then broadcast once per session"""
+        started = time.perf_counter()
+        due = {}  # engine -> slots (WORLD / BOTS), in due order
+        while self.heap and self.heap[0][0] <= now:
+            when, _, engine, slot = heapq.heappop(self.heap)
+            if not self._is_live(engine, slot):
+                self.planned.discard((engine, slot))
+                continue
+            interval = self.interval(engine, slot)
+            next_due = max(when + interval * self.rng.uniform(1 - self.jitter, 1 + self.jitter), now)
+            self._push(next_due, engine, slot)
+            due.setdefault(engine, []).append(slot)
+
+        for engine, slots in due.items():
+            if engine.human_count() == 0:
+                self.skipped += len(slots)
+                continue
+            tick_started = time.perf_counter()
+            pending_rooms = set()
+            try:
+                for slot in slots:
+                    if slot == WORLD:
+                        engine.ai_world_tick(pending_rooms)
+                    else:
+                        engine.ai_players_tick([p for p in engine.players.values() if p.is_ai], pending_rooms)
+                    self.ticks += 1
+            except Exception as e:
+                print(f"[AI] Tick error in session {engine.room_code}: {type(e).__name__}: {e}")
+            if pending_rooms:
+                engine.broadcast_rooms(pending_rooms)
+            AI_TICK_SECONDS.observe(time.perf_counter() - tick_started)
+        self.last_batch_seconds = time.perf_counter() - started
+
+    def metrics(self):
+        return {
+            "scheduled": len(self.heap),
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "last_batch_seconds": round(self.last_batch_seconds, 6)
+        }
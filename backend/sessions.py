@@ -0,0 +1,212 @@
+import asyncio
+import time
+from backend.game_engine import GameEngine
+from backend.journal import EventJournal
+from backend.scheduler import AIScheduler
+from backend.narrative import NarrativePool, NarrativeService
+
+DEFAULT_SESSION = "default"  # Session for clients that connect without a room code
+
+
+class UnknownSession(LookupError):
+    """No session exists (or was persisted) for a room code"""
+    status_code = 404
+
+
+class SessionManager:
+    """Keeps an isolated GameEngine (map, events, players, AI loop) per room_code"""
+
+    def __init__(self, idle_ttl=1800, sweep_interval=60, journal_dir="data/journal", snapshot_interval=30,
+                 flush_interval=0.025, journal_flush_interval=1.0):
+        self.sessions = {}  # room_code -> GameEngine
+        self.idle_ttl = idle_ttl  # Seconds an empty session is kept around
+        self.sweep_interval = sweep_interval
+        self.journal_dir = journal_dir  # None disables event journaling
+        self.snapshot_interval = snapshot_interval
+        self.journal_flush_interval = journal_flush_interval  # Seconds journal appends may sit in the write buffer
+        self.flush_interval = flush_interval  # Outbound event coalescing per session (0 disables)
+        self.running = False
+        self.sweeper = None
+        self.snapshotter = None
+        self.journal_flusher = None
+        self.loading = {}  # room_code -> task building the session off the event loop
+        self.closing = {}  # room_code -> task closing an evicted session's journal
+        self.scheduler = AIScheduler()
+        self.scheduler_task = None
+        self.narrator = NarrativeService.from_env()  # Shared so requests batch across sessions
+
+    def get(self, room_code):
+        """Get the engine for room_code, or None"""
+        return self.sessions.get(room_code or DEFAULT_SESSION)
+
+    async def open(self, room_code):
+        """Get the engine of an existing session: hosted here, being loaded, or
+        restorable from its journal. Raises UnknownSession otherwise, so reads
+        never create sessions (the default session always exists)."""
+        room_code = room_code or DEFAULT_SESSION
+        engine = self.sessions.get(room_code)
+        if engine is not None:
+            engine.touch()
+            return engine
+        if room_code == DEFAULT_SESSION or room_code in self.loading or (
+                self.journal_dir and await asyncio.to_thread(EventJournal.persisted, room_code, self.journal_dir)):
+            return await self.get_or_create(room_code)
+        raise UnknownSession(f"Unknown room code {room_code}")
+
+    async def get_or_create(self, room_code, story=None):
+        """Get the engine for room_code, creating it on first use. The engine is
+        built (journal opened, history replayed) in a thread; concurrent callers
+        for the same room_code wait for the same build."""
+        room_code = room_code or DEFAULT_SESSION
+        engine = self.sessions.get(room_code)
+        if engine is None:
+            task = self.loading.get(room_code)
+            if task is None:
+                task = self.loading[room_code] = asyncio.create_task(self._load(room_code, story))
+            engine = await asyncio.shield(task)
+        if story and not engine.story:
+            engine.story = story
+            self._attach_pool(engine)
+        engine.touch()
+        return engine
+
+    async def _load(self, room_code, story):
+        try:
+            closing = self.closing.get(room_code)
+            if closing is not None:
+                await asyncio.wait({closing})  # Reopen the journal only once it is closed
+            return self._register(await asyncio.to_thread(self._build, room_code, story))
+        finally:
+            self.loading.pop(room_code, None)
+
+    def _build(self, room_code, story=None):
+        """A new engine for room_code, restored from its journal if it has one (blocking)"""
+        engine = GameEngine(room_code=room_code, story=story, flush_interval=self.flush_interval)
+        engine.ai_engine.narrator = self.narrator
+        if self.journal_dir:
+            engine.attach_journal(EventJournal(room_code, self.journal_dir, engine.event_engine.max_events))
+        return engine
+
+    def _register(self, engine):
+        """Start hosting a built engine"""
+        self.sessions[engine.room_code] = engine
+        self.scheduler.add_session(engine)
+        self._attach_pool(engine)
+        print(f"[SESSIONS] Created session {engine.room_code} ({len(self.sessions)} active)")
+        return engine
+
+    def _attach_pool(self, engine):
+        """Give story sessions a prefetched narrative pool"""
+        if engine.story and engine.ai_engine.pool is None:
+            engine.ai_engine.pool = NarrativePool(self.narrator, engine)
+            engine.ai_engine.pool.start_refill()
+
+    def start(self):
+        """Start the AI scheduler and the idle sweeper (needs a running loop)"""
+        self.running = True
+        self.scheduler_task = asyncio.create_task(self.scheduler.run())
+        self.sweeper = asyncio.create_task(self.sweep_idle())
+        if self.journal_dir:
+            self.snapshotter = asyncio.create_task(self.snapshot_loop())
+            self.journal_flusher = asyncio.create_task(self.journal_flush_loop())
+
+    async def evict(self, room_code):
+        """Stop and forget a session, snapshotting it (with its players) first"""
+        engine = self.sessions.pop(room_code, None)
+        if engine is None:
+            return
+        self.scheduler.remove_session(engine)
+        state = engine.snapshot() if engine.journal else None
+        for player in list(engine.players.values()):
+            engine.remove_player(player)
+        if engine.journal:
+            task = self.closing[room_code] = asyncio.create_task(asyncio.to_thread(self._close_journal, engine.journal, state))
+            try:
+                await asyncio.shield(task)
+            finally:
+                if self.closing.get(room_code) is task:
+                    del self.closing[room_code]
+        print(f"[SESSIONS] Evicted session {room_code} ({len(self.sessions)} active)")
+
+    def idle_sessions(self, now=None):
+        """Room codes of sessions with no connected humans past the idle TTL"""
+        now = now or time.time()
+        return [
+            room_code for room_code, engine in self.sessions.items()
+            if room_code != DEFAULT_SESSION
+            and engine.human_count() == 0
+            and now - engine.last_active > self.idle_ttl
+        ]
+
+    async def sweep_idle(self):
+        """Periodically evict idle sessions"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            for room_code in self.idle_sessions():
+                try:
+                    await self.evict(room_code)
+                except Exception as e:
+                    print(f"[SESSIONS] Evicting {room_code} failed: {type(e).__name__}: {e}")
+
+    @staticmethod
+    def _close_journal(journal, state):
+        journal.write_snapshot(state)
+        journal.close()
+
+    async def snapshot_loop(self):
+        """Periodically snapshot every session that changed"""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            for engine in list(self.sessions.values()):
+                try:
+                    await engine.save_snapshot()
+                except Exception as e:
+                    print(f"[SESSIONS] Snapshot of {engine.room_code} failed: {type(e).__name__}: {e}")
+
+    async def journal_flush_loop(self):
+        """Push buffered journal appends to the OS every journal_flush_interval,
+        so a crashed worker loses at most that much history"""
+        while True:
+            await asyncio.sleep(self.journal_flush_interval)
+            for engine in list(self.sessions.values()):
+                if engine.journal:
+                    try:
+                        await asyncio.to_thread(engine.journal.flush)
+                    except Exception as e:
+                        print(f"[SESSIONS] Journal flush of {engine.room_code} failed: {type(e).__name__}: {e}")
+
+    async def close(self):
+        """Write final snapshots, close journals and the narrative provider (on shutdown)"""
+        for engine in list(self.sessions.values()):
+            if engine.journal:
+                await asyncio.to_thread(self._close_journal, engine.journal, engine.snapshot())
+        await self.narrator.close()
+
+    def player_count(self):
+        """Players across all sessions"""
+        return sum(len(engine.players) for engine in self.sessions.values())
+
+    def narrative_pool_metrics(self):
+        """Narrative pool hit rate and refill latency over all story sessions"""
+        pools = [e.ai_engine.pool for e in self.sessions.values() if e.ai_engine.pool is not None]
+        hits = sum(p.hits for p in pools)
+        draws = hits + sum(p.misses for p in pools)
+        refills = sum(p.refill_count for p in pools)
+        return {
+            "pools": len(pools),
+            "hits": hits,
+            "hit_rate": round(hits / draws, 4) if draws else None,
+            "refills": refills,
+            "avg_refill_seconds": round(sum(p.refill_seconds for p in pools) / refills, 6) if refills else None
+        }
+
+    def fanout_metrics(self):
+        """Fan-out queue metrics summed over all sessions (max depth is the overall max)"""
+        totals = {}
+        for engine in self.sessions.values():
+            for key, value in engine.fanout.metrics().items():
+                if key == "max_queue_depth":
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        return totals
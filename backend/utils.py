@@ -1,4 +1,8 @@
 # Utility functions and constants for Interactive Story Game
+import json
+from collections import deque
+from backend.encoding import encode_json
+from backend.maps import RoomGraph
 
 ROLES = [
     {
@@ -58,25 +62,27 @@ def get_room_adjacency(rooms_dict):
     return adjacency
 
 def calculate_sound_propagation(origin_room, target_room, awareness, adjacency):
-    """Calculate if sound from origin_room reaches target_room based on awareness"""
+    """Calculate if sound from origin_room reaches target_room based on awareness.
+    adjacency is either a RoomGraph (table lookup) or a get_room_adjacency() dict."""
     if origin_room == target_room:
         return True
     
+    if isinstance(adjacency, RoomGraph):
+        distance = adjacency.distance(origin_room, target_room)
+        return distance is not None and distance < awareness
+    
     # BFS to find shortest path
-    visited = set()
-    queue = [(origin_room, 0)]
+    visited = {origin_room}
+    queue = deque([(origin_room, 0)])
     
     while queue:
-        current, distance = queue.pop(0)
+        current, distance = queue.popleft()
         if current == target_room:
             return distance < awareness
         
-        if current in visited:
-            continue
-        visited.add(current)
-        
         for neighbor in adjacency.get(current, []):
             if neighbor not in visited:
+                visited.add(neighbor)
                 queue.append((neighbor, distance + 1))
     
     return False
@@ -85,88 +91,55 @@ def format_player_list(players):
     """Format list of players for display"""
     return [{"name": p.name, "room": p.get_room_name(), "role": p.role} for p in players.values()]
 
+def format_event_text(event):
+    """One line of the text export"""
+    return f"{event.get('type')}: {event.get('player', 'System')} - {event.get('text', '')}"
+
 def export_event_log(events, format="json"):
     """Export event log in different formats"""
     if format == "json":
-        return "\n".join([str(e) for e in events])
+        return json.dumps(list(events))
+    elif format == "ndjson":
+        return "".join(iter_event_log(events, format="ndjson"))
     elif format == "text":
-        return "\n".join([f"{e.get('type')}: {e.get('player', 'System')} - {e.get('text', '')}" for e in events])
-    return str(events)
+        return "\n".join([format_event_text(e) for e in events])
+    return str(list(events))
+
+def iter_event_log(events, format="ndjson", chunk_size=65536, encoded=False):
+    """Yield an export of events (ndjson, a JSON array, or text lines) in chunks
+    of about chunk_size characters, holding only one chunk at a time.
+    With encoded=True the events are already JSON strings (not for text)."""
+    if format == "text":
+        pieces = (format_event_text(e) + "\n" for e in events)
+    else:
+        if not encoded:
+            events = (encode_json(e) for e in events)
+        pieces = _json_array_pieces(events) if format == "json" else (e + "\n" for e in events)
+    chunk, size = [], 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+def _json_array_pieces(encoded_events):
+    yield "["
+    separator = ""
+    for event in encoded_events:
+        yield separator + event
+        separator = ","
+    yield "]\n"
 
 def generate_story_pdf(session_data):
-    """Generate a PDF from a game session using weasyprint"""
+    """Generate a PDF from a game session using weasyprint (blocking; the
+    server renders through backend.pdf_export.PdfJobs instead)"""
+    from backend.pdf_export import render_story_pdf
     try:
-        from weasyprint import HTML, CSS
-        from io import BytesIO
-        import json
-        
-        # Create HTML content
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                h1 {{ color: #333; border-bottom: 2px solid #333; }}
-                h2 {{ color: #666; margin-top: 20px; }}
-                .player {{ background: #f0f0f0; padding: 10px; margin: 5px 0; border-radius: 3px; }}
-                .event {{ background: #e8f4f8; padding: 8px; margin: 3px 0; border-left: 3px solid #0099cc; }}
-                .summary {{ color: #666; font-size: 12px; margin: 10px 0; }}
-            </style>
-        </head>
-        <body>
-            <h1>Interactive Story Game Session</h1>
-            <div class="summary">
-                <p><strong>Mode:</strong> {session_data.get('mode', 'unknown')}</p>
-                <p><strong>Difficulty:</strong> {session_data.get('difficulty', 'normal')}</p>
-                <p><strong>Total Events:</strong> {len(session_data.get('events', []))}</p>
-            </div>
-            
-            <h2>Players</h2>
-            {' '.join([f'<div class="player"><strong>{p.get("name")}</strong> - Role: {p.get("role", "None")} - Room: {p.get("current_room", "Unknown")}</div>' for p in session_data.get('players', [])])}
-            
-            <h2>Event Log</h2>
-            {' '.join([f'<div class="event"><strong>{e.get("type")}</strong>: {e.get("player", "System")} - {e.get("message") or e.get("text") or "event"}</div>' for e in session_data.get('events', [])])}
-            
-        </body>
-        </html>
-        """
-        
-        # Generate PDF
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        return pdf_bytes
-    
-    except ImportError:
-        raise ImportError("weasyprint is required for PDF export. Install with: pip install weasyprint")
+        return render_story_pdf(session_data)
+    except ImportError as e:
+        raise ImportError("PDF export requires weasyprint. Install with: pip install weasyprint") from e
     except Exception as e:
         raise Exception(f"PDF generation error: {str(e)}")
-
-def generate_narrative_event(player_name, context, difficulty="normal"):
-    """Generate a narrative event for story mode"""
-    narratives = {
-        "easy": [
-            f"You hear {player_name} moving around nearby.",
-            f"{player_name} appears in the room.",
-            f"A gentle breeze carries a whisper from {player_name}.",
-            "You sense something is shifting in the environment.",
-            "Time seems to move slowly here..."
-        ],
-        "normal": [
-            f"{player_name} suddenly looks your way.",
-            f"The atmosphere changes when {player_name} arrives.",
-            f"You hear {player_name} whispering something cryptic.",
-            "A mysterious figure emerges from the shadows.",
-            "The room feels electric with tension."
-        ],
-        "hard": [
-            f"{player_name} confronts you directly with intensity.",
-            f"An unexpected revelation about {player_name} strikes you.",
-            f"{player_name}'s actions have serious consequences.",
-            "A shocking twist disrupts everything you thought.",
-            "The stakes have never felt higher..."
-        ]
-    }
-    
-    import random
-    events_for_difficulty = narratives.get(difficulty, narratives["normal"])
-    return random.choice(events_for_difficulty)
-
@@ -8,11 +8,14 @@ let gameState = {
     chatMessages: [],
     connectedRooms: [],
     allRooms: ["Library", "Kitchen", "Hallway", "Basement", "Attic"],
-    gameMode: null  // "story" or "game"
+    gameMode: null,  // "story" or "game"
+    lastSeq: 0  // Sequence number of the last event received (for resync)
 };
 
 // WebSocket connection
 let socket = null;
+let reconnectAttempts = 0;
+const MAX_RECONNECT_ATTEMPTS = 5;
 
 // Initialize on page load - show welcome screen
 window.addEventListener('load', function() {
@@ -33,9 +36,14 @@ function startStory() {
     document.getElementById('story-menu').classList.remove('hidden');
 }
 
+// "&room_code=..." for requests about the current story room (empty when there is none)
+function roomCodeParam() {
+    return gameState.storyRoomCode ? `&room_code=${encodeURIComponent(gameState.storyRoomCode)}` : '';
+}
+
 function saveStory() {
     // trigger backend save (session autosave)
-    fetch('/game/save-session?session_name=story_autosave', { method: 'POST' })
+    fetch(`/game/save-session?session_name=story_autosave${roomCodeParam()}`, { method: 'POST' })
         .then(r => r.json())
         .then(j => alert('Story saved'))
         .catch(e => alert('Save failed'));
@@ -43,7 +51,8 @@ function saveStory() {
 
 function exportPDF() {
     // open PDF export in new window/tab
-    window.open('/game/export-pdf', '_blank');
+    const roomCode = gameState.storyRoomCode ? `?room_code=${encodeURIComponent(gameState.storyRoomCode)}` : '';
+    window.open(`/game/export-pdf${roomCode}`, '_blank');
 }
 
 function backToWelcome() {
@@ -134,10 +143,13 @@ function startGame() {
         alert('Please enter a name');
         return;
     }
+    gameState.storyRoomCode = null;  // Game mode plays in the default session
     joinGame(playerName, 'game');
 }
 
 function joinGame(playerName, mode) {
+    gameState.lastSeq = 0;  // new join: no events to resume from
+    reconnectAttempts = 0;
     gameState.playerId = playerName;
     gameState.gameMode = mode;
     
@@ -156,7 +168,7 @@ function joinGame(playerName, mode) {
     connectToServer(playerName, mode);
 }
 
-function connectToServer(playerId, mode) {
+function connectToServer(playerId, mode, reconnecting = false) {
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     // Determine backend host/port.
     // If the page is served from a different port (e.g. Live Server on 5500), prefer the backend on port 8001.
@@ -174,21 +186,31 @@ function connectToServer(playerId, mode) {
         // Page is served from same backend port
         host = window.location.host;
     }
+    const params = new URLSearchParams();
+    if (gameState.storyRoomCode) {
+        params.set('room', gameState.storyRoomCode);
+    }
+    if (gameState.lastSeq) {
+        params.set('since', gameState.lastSeq);  // server replays the events we missed
+    }
     let wsUrl = `${wsProtocol}//${host}/ws/${playerId}`;
-    if (mode === 'story' && gameState.storyRoomCode) {
-        wsUrl += `?room=${encodeURIComponent(gameState.storyRoomCode)}`;
+    if (params.toString()) {
+        wsUrl += `?${params}`;
+    }
+    // tell server the selected mode/difficulty (best-effort; not again on reconnect)
+    if (!reconnecting) {
+        try {
+            const difficulty = document.getElementById('difficulty-select') ? document.getElementById('difficulty-select').value : 'normal';
+            fetch(`/game/mode?mode=${encodeURIComponent(mode)}&difficulty=${encodeURIComponent(difficulty)}${roomCodeParam()}`, { method: 'POST' }).catch(()=>{});
+        } catch(e) {}
     }
-    // tell server the selected mode/difficulty (best-effort)
-    try {
-        const difficulty = document.getElementById('difficulty-select') ? document.getElementById('difficulty-select').value : 'normal';
-        fetch(`/game/mode?mode=${encodeURIComponent(mode)}&difficulty=${encodeURIComponent(difficulty)}`, { method: 'POST' }).catch(()=>{});
-    } catch(e) {}
 
     console.log(`Connecting to ${wsUrl} in ${mode} mode...`);
     socket = new WebSocket(wsUrl);
     
     socket.onopen = function(event) {
         console.log("Connected to server");
+        reconnectAttempts = 0;
         updateStatus("Connected", true);
     };
     
@@ -211,6 +233,13 @@ function connectToServer(playerId, mode) {
     socket.onclose = function(event) {
         console.log("Disconnected from server");
         updateStatus("Disconnected", false);
+        // Dropped connection: reconnect and resume from the last event seen
+        if (!event.wasClean && reconnectAttempts < MAX_RECONNECT_ATTEMPTS) {
+            reconnectAttempts++;
+            updateStatus("Reconnecting...", false);
+            setTimeout(() => connectToServer(playerId, mode, true), 1000 * reconnectAttempts);
+            return;
+        }
         // show brief guidance if connection closed immediately
         if (!event.wasClean) {
             alert('Disconnected from server. Make sure the backend is running (uvicorn backend.main:app --reload --port 8001) and you opened the game from http://localhost:8001/');
@@ -224,6 +253,10 @@ function handleMessage(data) {
     if (type === "welcome") {
         handleWelcome(data);
     } else if (type === "events") {
+        if (data.seq) gameState.lastSeq = data.seq;
+        if (data.truncated) {
+            console.warn(`Missed events before seq ${data.first_seq}; see /game/event-log for the full history`);
+        }
         handleEvents(data.events);
     } else if (type === "player_moved") {
         addEvent({
@@ -287,8 +320,9 @@ function handleEvents(events) {
     if (!events || events.length === 0) return;
     
     events.forEach(event => {
-        // Story mode transforms AI events into immersive narrative
-        if (gameState.gameMode === 'story' && event.type === "ai_event") {
+        // Story mode transforms AI events into immersive narrative; beats about
+        // this player's character are narrative in any mode
+        if (event.type === "narrative" || (gameState.gameMode === 'story' && event.type === "ai_event")) {
             displayNarrative(event.text);
             return;
         }
@@ -44,6 +44,13 @@ print(f'Format: {data.get("format")}')
 content_preview = str(data.get("content", ""))[:100]
 print(f'Content preview: {content_preview}...\n')
 
+# Test 5b: Streaming export
+print('5b. GET /game/export-log/stream')
+r = requests.get(f'{base_url}/game/export-log/stream?format=ndjson', stream=True)
+print(f'Status: {r.status_code}')
+lines = [line for line in r.iter_lines() if line]
+print(f'Streamed events: {len(lines)}\n')
+
 # Test 6: Health check
 print('6. GET /health')
 r = requests.get(f'{base_url}/health')
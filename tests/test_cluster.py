@@ -0,0 +1,93 @@
+import asyncio
+import time
+from backend.cluster import ClusterRouter, HashRing, RemoteError, UnixSocketBus, WorkerTimeout
+
+KEYS = [f"ROOM{n}" for n in range(2000)]
+
+
+def test_hash_ring_is_stable_across_instances():
+    first, second = HashRing(range(4)), HashRing(range(4))
+    assert [first.node_for(key) for key in KEYS] == [second.node_for(key) for key in KEYS]
+
+
+def test_hash_ring_uses_every_node():
+    ring = HashRing(range(4))
+    assert {ring.node_for(key) for key in KEYS} == {0, 1, 2, 3}
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before, after = HashRing(range(4)), HashRing(range(5))
+    moved = [key for key in KEYS if before.node_for(key) != after.node_for(key)]
+    assert all(after.node_for(key) == 4 for key in moved)
+    assert len(moved) < len(KEYS) / 2
+
+
+def run_pair(scenario, tmp_path):
+    """Run scenario(caller, callee) with two routers on one Unix socket bus"""
+    async def main():
+        caller = ClusterRouter(None, UnixSocketBus(0, tmp_path), 0, 2)
+        callee = ClusterRouter(None, UnixSocketBus(1, tmp_path), 1, 2)
+        await caller.start()
+        await callee.start()
+        try:
+            return await scenario(caller, callee)
+        finally:
+            await caller.bus.close()
+            await callee.bus.close()
+    return asyncio.run(main())
+
+
+def test_call_returns_result(tmp_path):
+    async def scenario(caller, callee):
+        async def add(a, b):
+            return a + b
+        callee.methods = {"add": add}
+        return await caller.call(1, "add", a=2, b=3)
+    assert run_pair(scenario, tmp_path) == 5
+
+
+def test_slow_call_does_not_block_the_bus(tmp_path):
+    async def scenario(caller, callee):
+        async def slow():
+            await asyncio.sleep(0.5)
+            return "slow"
+        async def fast():
+            return "fast"
+        callee.methods = {"slow": slow, "fast": fast}
+        slow_call = asyncio.create_task(caller.call(1, "slow"))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        assert await caller.call(1, "fast") == "fast"
+        fast_seconds = time.monotonic() - started
+        assert await slow_call == "slow"
+        return fast_seconds
+    assert run_pair(scenario, tmp_path) < 0.3
+
+
+def test_call_timeout(tmp_path):
+    async def scenario(caller, callee):
+        async def slow():
+            await asyncio.sleep(1)
+        callee.methods = {"slow": slow}
+        try:
+            await caller.call(1, "slow", timeout=0.1)
+        except WorkerTimeout:
+            return caller.calls
+        raise AssertionError("call did not time out")
+    assert run_pair(scenario, tmp_path) == {}
+
+
+def test_remote_error_carries_status_code(tmp_path):
+    class Missing(LookupError):
+        status_code = 404
+
+    async def scenario(caller, callee):
+        async def lookup():
+            raise Missing("no such session")
+        callee.methods = {"lookup": lookup}
+        try:
+            await caller.call(1, "lookup")
+        except RemoteError as e:
+            return e.status_code, str(e)
+        raise AssertionError("call did not fail")
+    assert run_pair(scenario, tmp_path) == (404, "no such session")
@@ -0,0 +1,71 @@
+import pytest
+from backend.encoding import FRAME_DEFLATE, FRAME_PLAIN, MsgPackCodec, negotiate_protocol
+
+msgpack = pytest.importorskip("msgpack")
+
+NAMES = {"alice", "bob", "Library", "Hall"}
+
+
+def codec(**kwargs):
+    return MsgPackCodec(known_name=NAMES.__contains__, **kwargs)
+
+
+def events(count):
+    return {
+        "type": "events",
+        "seq": count,
+        "events": [
+            {"type": "chat", "player": "alice", "room": "Library", "message": f"hello {n}", "seq": n}
+            for n in range(1, count + 1)
+        ],
+    }
+
+
+def round_trip(message, deflate):
+    sender, receiver = codec(), codec()
+    payload, added = sender.pack(message)
+    # Receivers learn the id table from the "ids" frame sent before first use
+    table = msgpack.unpackb(sender.table_frame(added)[1:], raw=False, strict_map_key=False)
+    receiver.names = [table["add"][i] for i in sorted(table["add"])]
+    return receiver.decode(sender.frame(payload, deflate=deflate)), sender.frame(payload, deflate=deflate)
+
+
+def test_round_trip_plain():
+    message = events(3)
+    decoded, frame = round_trip(message, deflate=False)
+    assert frame[0] == FRAME_PLAIN
+    assert decoded == message
+
+
+def test_round_trip_deflate():
+    message = events(100)
+    decoded, frame = round_trip(message, deflate=True)
+    assert frame[0] == FRAME_DEFLATE
+    assert decoded == message
+
+
+def test_small_frames_are_not_deflated():
+    message = events(1)
+    decoded, frame = round_trip(message, deflate=True)
+    assert frame[0] == FRAME_PLAIN
+    assert decoded == message
+
+
+def test_known_names_become_ids_and_others_stay_strings():
+    sender = codec()
+    _, added = sender.pack({"type": "ability_used", "player": "bob", "target": "the door"})
+    assert list(added.values()) == ["bob"]
+    _, added = sender.pack({"type": "chat", "player": "bob"})
+    assert added == {}
+
+
+def test_negotiate_protocol():
+    assert negotiate_protocol(None, []) == ("json", None)
+    assert negotiate_protocol("msgpack", []) == ("msgpack", None)
+    assert negotiate_protocol("bogus", []) == ("json", None)
+    assert negotiate_protocol(None, ["isg.msgpack+deflate"]) == ("msgpack+deflate", "isg.msgpack+deflate")
+
+
+def test_query_plus_decoded_as_space_is_accepted():
+    # ?protocol=msgpack+deflate arrives as "msgpack deflate" after query decoding
+    assert negotiate_protocol("msgpack deflate", []) == ("msgpack+deflate", None)
@@ -0,0 +1,112 @@
+from backend.events import EventBuffer, EventEngine
+
+
+def filled(capacity, count):
+    buffer = EventBuffer(capacity)
+    for n in range(1, count + 1):
+        buffer.append({"n": n})
+    return buffer
+
+
+def small_engine(capacity):
+    engine = EventEngine(None)
+    engine.events = EventBuffer(capacity)
+    return engine
+
+
+def test_append_returns_increasing_seqs():
+    buffer = EventBuffer(4)
+    assert [buffer.append({}) for _ in range(3)] == [1, 2, 3]
+    assert buffer.first_seq == 1
+    assert len(buffer) == 3
+
+
+def test_wrap_around_keeps_newest_capacity_events():
+    buffer = filled(4, 10)
+    assert buffer.last_seq == 10
+    assert buffer.first_seq == 7
+    assert len(buffer) == 4
+    assert [e["n"] for e in buffer] == [7, 8, 9, 10]
+    assert buffer.get(7) == {"n": 7}
+
+
+def test_get_outside_retention_raises():
+    buffer = filled(4, 10)
+    for seq in (0, 6, 11):
+        try:
+            buffer.get(seq)
+        except KeyError:
+            continue
+        raise AssertionError(f"get({seq}) did not raise")
+
+
+def test_since_across_overwritten_slots():
+    buffer = filled(4, 10)
+    # seq 3 has been overwritten: since() starts at the oldest retained event
+    assert [e["n"] for e in buffer.since(3)] == [7, 8, 9, 10]
+    assert [e["n"] for e in buffer.since(8)] == [9, 10]
+    assert list(buffer.since(10)) == []
+
+
+def test_last_is_clamped_to_retained_events():
+    buffer = filled(4, 10)
+    assert [e["n"] for e in buffer.last(2)] == [9, 10]
+    assert [e["n"] for e in buffer.last(100)] == [7, 8, 9, 10]
+
+
+def test_view_negative_indexing():
+    view = filled(4, 10).view()
+    assert view[-1] == {"n": 10}
+    assert view[-4] == {"n": 7}
+    for index in (4, -5):
+        try:
+            view[index]
+        except IndexError:
+            continue
+        raise AssertionError(f"view[{index}] did not raise")
+
+
+def test_view_slicing():
+    view = filled(4, 10).view()
+    assert [e["n"] for e in view[1:3]] == [8, 9]
+    assert [e["n"] for e in view[-2:]] == [9, 10]
+    assert [e["n"] for e in view[::2]] == [7, 9]
+    assert [e["n"] for e in view[:0]] == []
+    assert [e["n"] for e in reversed(view)] == [10, 9, 8, 7]
+
+
+def test_slot_reads_overwritten_event_without_check():
+    buffer = filled(4, 10)
+    # Seqs 2, 6 and 10 share a slot; it now holds seq 10
+    assert buffer.slot(2) == {"n": 10}
+
+
+def test_is_truncated():
+    engine = small_engine(4)
+    for _ in range(10):
+        engine.add_event({"type": "chat", "room": "Library"})
+    assert engine.events.first_seq == 7
+    assert engine.is_truncated(0)
+    assert engine.is_truncated(5)
+    assert not engine.is_truncated(6)  # Next event (7) is still retained
+    assert not engine.is_truncated(10)
+
+
+def test_indexes_pruned_after_wrap():
+    engine = small_engine(4)
+    for n in range(10):
+        engine.add_event({"type": "chat", "room": "Library" if n % 2 else "Hall"})
+    first_seq = engine.events.first_seq
+    for index in engine.room_index.values():
+        assert index[0] >= first_seq
+    assert list(engine.room_index["Library"]) == [8, 10]
+    assert list(engine.visibility_index["global"]) == [7, 8, 9, 10]
+
+
+def test_replay_event_keeps_seq():
+    engine = small_engine(4)
+    engine.replay_event({"type": "chat", "seq": 42, "timestamp": 1.0})
+    assert engine.last_seq == 42
+    assert engine.events.get(42)["timestamp"] == 1.0
+    engine.add_event({"type": "chat"})
+    assert engine.last_seq == 43
@@ -0,0 +1,94 @@
+import json
+from backend.journal import INDEX_STRIDE, RECORD_HEADER, EventJournal
+
+
+def write_events(journal, first, last):
+    for seq in range(first, last + 1):
+        journal.append({"type": "chat", "seq": seq})
+
+
+def test_read_after_seq(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, 10)
+    assert [e["seq"] for e in journal.read(after_seq=7)] == [8, 9, 10]
+    assert len(list(journal.read())) == 10
+    journal.close()
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, 3)
+    journal.close()
+    size = journal.path.stat().st_size
+    # A crash mid-write: a header promising more bytes than were written
+    with open(journal.path, "ab") as f:
+        f.write(RECORD_HEADER.pack(100) + b'{"seq"')
+
+    journal = EventJournal("room", journal_dir=tmp_path)
+    assert journal.path.stat().st_size == size
+    assert journal.records == 3
+    write_events(journal, 4, 4)
+    assert [e["seq"] for e in journal.read()] == [1, 2, 3, 4]
+    journal.close()
+
+
+def test_torn_header_is_truncated_on_open(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, 2)
+    journal.close()
+    size = journal.path.stat().st_size
+    with open(journal.path, "ab") as f:
+        f.write(b"\x00\x00")
+
+    journal = EventJournal("room", journal_dir=tmp_path)
+    assert journal.path.stat().st_size == size
+    journal.close()
+
+
+def test_offset_for_uses_sparse_index(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, INDEX_STRIDE * 2 + 10)
+    assert journal.index_seqs == [1, INDEX_STRIDE + 1, INDEX_STRIDE * 2 + 1]
+    assert journal.offset_for(0) == 0
+    assert journal.offset_for(INDEX_STRIDE) == 0
+    assert journal.offset_for(INDEX_STRIDE + 1) == journal.index_offsets[1]
+    assert journal.offset_for(INDEX_STRIDE * 2 + 5) == journal.index_offsets[2]
+    after = INDEX_STRIDE + 50
+    assert [e["seq"] for e in journal.read(after_seq=after)] == list(range(after + 1, INDEX_STRIDE * 2 + 11))
+    journal.close()
+
+
+def test_sparse_index_rebuilt_on_open(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, INDEX_STRIDE + 1)
+    seqs, offsets = journal.index_seqs, journal.index_offsets
+    journal.close()
+
+    journal = EventJournal("room", journal_dir=tmp_path)
+    assert journal.index_seqs == seqs
+    assert journal.index_offsets == offsets
+    journal.close()
+
+
+def test_read_raw_matches_read(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, 5)
+    assert [json.loads(text) for text in journal.read_raw(after_seq=2)] == list(journal.read(after_seq=2))
+    journal.close()
+
+
+def test_snapshot_round_trip(tmp_path):
+    journal = EventJournal("room", journal_dir=tmp_path)
+    write_events(journal, 1, 3)
+    journal.write_snapshot({"players": []})
+    snapshot = journal.load_snapshot()
+    assert snapshot["players"] == []
+    assert snapshot["journal_seq"] == 3
+    assert journal.snapshot_seq == 3
+    assert EventJournal.persisted("room", journal_dir=tmp_path)
+    journal.close()
+
+
+def test_persisted_does_not_create_files(tmp_path):
+    assert not EventJournal.persisted("nobody", journal_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from backend.scheduler import BOTS, WORLD, AIScheduler
+
+
+class FakePlayer:
+    def __init__(self, is_ai):
+        self.is_ai = is_ai
+
+
+class FakeAIEngine:
+    def settings_for(self, difficulty):
+        return {"world_interval": 10.0, "player_interval": 10.0}
+
+
+class FakeSession:
+    """Just enough of GameEngine for the scheduler; ticks are recorded in log"""
+
+    def __init__(self, name, log, humans=1, bots=0):
+        self.room_code = name
+        self.log = log
+        self.difficulty = "normal"
+        self.ai_engine = FakeAIEngine()
+        self.scheduler = None
+        self.players = {f"{name}-p{n}": FakePlayer(n >= humans) for n in range(humans + bots)}
+        self.broadcasts = 0
+
+    def human_count(self):
+        return sum(not p.is_ai for p in self.players.values())
+
+    def ai_world_tick(self, pending_rooms):
+        self.log.append((self.room_code, WORLD))
+        pending_rooms.add("Library")
+
+    def ai_players_tick(self, players, pending_rooms):
+        self.log.append((self.room_code, BOTS, len(players)))
+
+    def broadcast_rooms(self, rooms):
+        self.broadcasts += 1
+
+
+def run_due(scheduler, now):
+    asyncio.run(scheduler.run_due(now))
+
+
+def run_first_ticks(scheduler):
+    """Run every first tick; without jitter none comes due again in the batch"""
+    run_due(scheduler, max(due for due, _, _, _ in scheduler.heap))
+
+
+def test_first_ticks_spread_within_one_interval():
+    scheduler = AIScheduler(seed=1)
+    start = time.monotonic()
+    scheduler.add_session(FakeSession("A", [], bots=1))
+    dues = {slot: due - start for due, _, _, slot in scheduler.heap}
+    assert 0 <= dues[WORLD] <= 10.0 + 0.1
+    assert 0 <= dues[BOTS] <= 10.0 + 0.1
+
+
+def test_due_ticks_run_in_due_order():
+    log = []
+    scheduler = AIScheduler(jitter=0, seed=1)
+    for name in "ABCD":
+        scheduler.add_session(FakeSession(name, log))
+    expected = [(engine.room_code, slot) for _, _, engine, slot in sorted(scheduler.heap)]
+    run_first_ticks(scheduler)
+    assert log == expected
+    assert scheduler.ticks == 4
+
+
+def test_only_due_ticks_run():
+    log = []
+    scheduler = AIScheduler(seed=1)
+    scheduler.add_session(FakeSession("A", log))
+    due = scheduler.heap[0][0]
+    run_due(scheduler, due - 0.001)
+    assert log == []
+    run_due(scheduler, due)
+    assert log == [("A", WORLD)]
+
+
+def test_ticks_are_rescheduled_with_jitter():
+    scheduler = AIScheduler(jitter=0.2, seed=1)
+    scheduler.add_session(FakeSession("A", []))
+    due = scheduler.heap[0][0]
+    run_due(scheduler, due)
+    next_due = scheduler.heap[0][0]
+    assert 10.0 * 0.8 <= next_due - due <= 10.0 * 1.2
+
+
+def test_one_broadcast_per_session_per_batch():
+    log = []
+    scheduler = AIScheduler(jitter=0, seed=1)
+    session = FakeSession("A", log, bots=2)
+    scheduler.add_session(session)
+    run_first_ticks(scheduler)
+    assert sorted(log) == [("A", BOTS, 2), ("A", WORLD)]  # One bot tick for both AI players
+    assert session.broadcasts == 1
+
+
+def test_sessions_without_humans_are_skipped():
+    log = []
+    scheduler = AIScheduler(jitter=0, seed=1)
+    scheduler.add_session(FakeSession("A", log, humans=0))
+    run_first_ticks(scheduler)
+    assert log == []
+    assert scheduler.skipped == 1
+    assert len(scheduler.heap) == 1  # Still scheduled for when someone joins
+
+
+def test_removed_sessions_are_dropped_when_due():
+    log = []
+    scheduler = AIScheduler(seed=1)
+    session = FakeSession("A", log)
+    scheduler.add_session(session)
+    scheduler.remove_session(session)
+    run_first_ticks(scheduler)
+    assert log == []
+    assert scheduler.heap == []
+    assert scheduler.planned == set()
@@ -0,0 +1,325 @@
+"""WebSocket load generator and latency benchmark.
+
+Simulates N clients in each of M sessions sending a mix of move/chat/ability
+actions, and measures the time from sending an action to receiving the
+resulting event on the same socket (which covers the flush, the fan-out queue
+and the send path). Runs against backend.main:app in-process over ASGI (the
+default), or against a running server with --url.
+
+    python tools/load_test.py --sessions 4 --clients 8 --duration 10
+    python tools/load_test.py --url ws://127.0.0.1:8001 --output run.json
+    python tools/load_test.py --baseline base.json --threshold 0.2
+
+With --baseline, the run fails (exit status 1) when a latency percentile
+rises, or delivered throughput drops, by more than the threshold.
+Run from the repository root.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ACTION_TYPES = ("move", "chat", "ability")
+ABILITIES = ("Investigate", "Listen", "Hide", "Search")
+PERCENTILES = (50, 95, 99)
+
+
+class AsgiWebSocket:
+    """Minimal in-process websocket client that talks ASGI to an app"""
+
+    def __init__(self, app, path, query_string="", subprotocols=()):
+        self.app = app
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": query_string.encode(), "headers": [(b"host", b"loadtest")],
+            "client": ("127.0.0.1", 0), "server": ("loadtest", 80), "subprotocols": list(subprotocols)
+        }
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        self.task = None
+        self.subprotocol = None
+
+    async def connect(self):
+        self.to_app.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(self.app(self.scope, self.to_app.get, self.from_app.put))
+        message = await self.from_app.get()
+        if message["type"] != "websocket.accept":
+            raise ConnectionError(f"websocket rejected: {message}")
+        self.subprotocol = message.get("subprotocol")
+        return self
+
+    async def send(self, data):
+        key = "bytes" if isinstance(data, bytes) else "text"
+        self.to_app.put_nowait({"type": "websocket.receive", key: data})
+
+    async def recv(self):
+        message = await self.from_app.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionError("websocket closed by server")
+        return message.get("text") if message.get("text") is not None else message.get("bytes")
+
+    async def close(self):
+        self.to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self.task, 5)
+        except (asyncio.TimeoutError, Exception):
+            self.task.cancel()
+
+
+class Client:
+    """One simulated player: sends actions and matches the events it gets back"""
+
+    def __init__(self, name, room_code, options, rng, neighbors):
+        self.name = name
+        self.room_code = room_code
+        self.options = options
+        self.rng = rng
+        self.neighbors = neighbors  # room name -> adjacent room names
+        self.room = None
+        self.socket = None
+        self.codec = None  # MsgPackCodec used to read binary frames
+        self.pending = {}  # match key -> (action type, send time)
+        self.moves = []  # send times of moves, in order (matched by player_moved events)
+        self.latencies = {t: [] for t in ACTION_TYPES}
+        self.sent = {t: 0 for t in ACTION_TYPES}
+        self.frames = 0
+        self.events = 0
+        self.counter = 0
+
+    async def connect(self, app, url):
+        params = {"room_code": self.room_code}
+        if self.options.protocol != "json":
+            from backend.encoding import MsgPackCodec
+            self.codec = MsgPackCodec()
+            params["protocol"] = self.options.protocol
+        query = urlencode(params)
+        path = f"/ws/{self.name}"
+        if url:
+            import websockets
+            self.socket = await websockets.connect(f"{url.rstrip('/')}{path}?{query}", max_size=None)
+        else:
+            self.socket = await AsgiWebSocket(app, path, query).connect()
+        welcome = self.decode(await self.socket.recv())
+        while welcome.get("type") != "welcome":
+            welcome = self.decode(await self.socket.recv())
+        if welcome.get("protocol", "json") != self.options.protocol:
+            raise ConnectionError(f"asked for {self.options.protocol}, server speaks {welcome.get('protocol', 'json')}")
+        self.room = welcome["player"]["current_room"]
+
+    def decode(self, frame):
+        if isinstance(frame, bytes):
+            message = self.codec.decode(frame)
+            if message.get("type") == "ids":
+                for table_id, name in sorted(message["add"].items()):
+                    if table_id >= len(self.codec.names):
+                        self.codec.names.extend([None] * (table_id + 1 - len(self.codec.names)))
+                    self.codec.names[table_id] = name
+            return message
+        return json.loads(frame)
+
+    def next_action(self):
+        self.counter += 1
+        token = f"{self.name}:{self.counter}"
+        action_type = self.rng.choices(ACTION_TYPES, weights=[self.options.mix[t] for t in ACTION_TYPES])[0]
+        if action_type == "move":
+            self.room = self.rng.choice(self.neighbors[self.room])
+            return action_type, None, {"type": "move", "room": self.room}
+        if action_type == "chat":
+            return action_type, token, {"type": "chat", "message": f"load {token}"}
+        return action_type, token, {"type": "ability", "ability": f"{self.rng.choice(ABILITIES)} {token}"}
+
+    async def send_loop(self, until):
+        while True:
+            delay = self.rng.expovariate(self.options.rate)
+            if time.perf_counter() + delay >= until:
+                return
+            await asyncio.sleep(delay)
+            action_type, token, action = self.next_action()
+            now = time.perf_counter()
+            if token is None:
+                self.moves.append(now)
+            else:
+                self.pending[token] = (action_type, now)
+            self.sent[action_type] += 1
+            await self.socket.send(json.dumps(action))
+
+    async def recv_loop(self):
+        try:
+            while True:
+                message = self.decode(await self.socket.recv())
+                received = time.perf_counter()
+                self.frames += 1
+                events = message.get("events", []) if message.get("type") == "events" else [message]
+                for event in events:
+                    self.events += 1
+                    self.match(event, received)
+        except Exception:
+            return  # Socket closed
+
+    def match(self, event, received):
+        if event.get("player") != self.name:
+            return
+        event_type = event.get("type")
+        if event_type == "player_moved" and self.moves:
+            self.latencies["move"].append(received - self.moves.pop(0))
+            return
+        if event_type == "chat":
+            token = event.get("message", "")[len("load "):]
+        elif event_type == "ability_used":
+            token = (event.get("ability") or "").rpartition(" ")[2]
+        else:
+            return
+        sent = self.pending.pop(token, None)
+        if sent is not None:
+            self.latencies[sent[0]].append(received - sent[1])
+
+
+def parse_mix(text):
+    mix = {t: 0.0 for t in ACTION_TYPES}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in mix:
+            raise argparse.ArgumentTypeError(f"unknown action type {name!r} (expected {', '.join(ACTION_TYPES)})")
+        mix[name.strip()] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def percentiles(samples):
+    """p50/p95/p99/max/mean of latencies in seconds, as milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3)
+    summary["max"] = round(ordered[-1] * 1000, 3)
+    summary["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return summary
+
+
+async def run_load(options):
+    from backend.maps import MapGenerator
+    default_map = MapGenerator().generate_default_map()
+    neighbors = {name: [r.name for r in room.connections] for name, room in default_map.rooms.items()}
+
+    app = None
+    lifespan = contextlib.AsyncExitStack()
+    if not options.url:
+        os.chdir(ROOT)  # The app serves frontend/ and writes data/ relative to the repo
+        from backend.main import app
+        await lifespan.enter_async_context(app.router.lifespan_context(app))  # Startup/shutdown events
+
+    rng = random.Random(options.seed)
+    clients = [
+        Client(f"lt{s}_{c}", f"{options.prefix}-{s}", options, random.Random(rng.random()), neighbors)
+        for s in range(options.sessions) for c in range(options.clients)
+    ]
+    try:
+        await asyncio.gather(*(client.connect(app, options.url) for client in clients))
+        receivers = [asyncio.create_task(client.recv_loop()) for client in clients]
+        await asyncio.sleep(options.warmup)
+
+        started = time.perf_counter()
+        until = started + options.duration
+        await asyncio.gather(*(client.send_loop(until) for client in clients))
+        await asyncio.sleep(options.drain)  # Let in-flight actions come back
+        elapsed = time.perf_counter() - started
+
+        for client in clients:
+            await client.socket.close()
+        for task in receivers:
+            task.cancel()
+    finally:
+        await lifespan.aclose()
+
+    latencies = {t: [s for c in clients for s in c.latencies[t]] for t in ACTION_TYPES}
+    sent = sum(sum(c.sent.values()) for c in clients)
+    delivered = sum(len(v) for v in latencies.values())
+    return {
+        "config": {
+            "target": options.url or "in-process", "sessions": options.sessions, "clients": options.clients,
+            "rate": options.rate, "duration": options.duration, "mix": options.mix,
+            "protocol": options.protocol, "seed": options.seed
+        },
+        "elapsed_s": round(elapsed, 3),
+        "actions_sent": sent,
+        "actions_delivered": delivered,
+        "actions_lost": sent - delivered,
+        "throughput": {
+            "sent_per_s": round(sent / options.duration, 2),
+            "delivered_per_s": round(delivered / options.duration, 2),
+            "frames_per_s": round(sum(c.frames for c in clients) / elapsed, 2),
+            "events_per_s": round(sum(c.events for c in clients) / elapsed, 2)
+        },
+        "latency_ms": {
+            "all": percentiles([s for v in latencies.values() for s in v]),
+            **{t: percentiles(v) for t, v in latencies.items() if v}
+        }
+    }
+
+
+def compare(result, baseline, threshold):
+    """Regressions of result against a baseline run, as readable strings"""
+    regressions = []
+    current, previous = result["latency_ms"]["all"], baseline["latency_ms"]["all"]
+    for p in PERCENTILES:
+        key = f"p{p}"
+        if key in current and previous.get(key) and current[key] > previous[key] * (1 + threshold):
+            regressions.append(f"latency {key} {current[key]}ms > baseline {previous[key]}ms")
+    rate, base_rate = result["throughput"]["delivered_per_s"], baseline["throughput"]["delivered_per_s"]
+    if base_rate and rate < base_rate * (1 - threshold):
+        regressions.append(f"delivered {rate}/s < baseline {base_rate}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Server to load, e.g. ws://127.0.0.1:8001 (default: in-process app)")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions (room codes)")
+    parser.add_argument("--clients", type=int, default=4, help="Clients per session")
+    parser.add_argument("--rate", type=float, default=2.0, help="Actions per second per client")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load")
+    parser.add_argument("--warmup", type=float, default=0.5, help="Seconds between connecting and sending")
+    parser.add_argument("--drain", type=float, default=1.0, help="Seconds to wait for in-flight actions")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("move=0.3,chat=0.5,ability=0.2"),
+                        help="Action weights, e.g. move=0.3,chat=0.5,ability=0.2")
+    parser.add_argument("--protocol", choices=("json", "msgpack", "msgpack+deflate"), default="json")
+    parser.add_argument("--prefix", default="load", help="Room code prefix of the sessions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the result JSON here")
+    parser.add_argument("--baseline", help="Result JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the in-process server's log output")
+    options = parser.parse_args()
+
+    server_log = contextlib.nullcontext() if options.verbose or options.url else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with server_log:
+        result = asyncio.run(run_load(options))
+
+    print(json.dumps(result, indent=2))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = compare(result, json.load(f), options.threshold)
+        for regression in regressions:
+            print("REGRESSION:", regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Microbenchmarks for the engine hot paths.
+
+Each benchmark times one operation (adding an event, filtering events for a
+player, a room broadcast through the fan-out to fake sockets, sound
+propagation, a move, an event log export, Database reads and writes) over
+every combination of the parameters it depends on: player count, event
+buffer size, map size and export format.
+
+    python tools/microbench.py --list
+    python tools/microbench.py add_event filter_events --events 1000,10000
+    python tools/microbench.py --players 10,100 --map default,large --output bench.json
+    python tools/microbench.py --memory            # tracemalloc peak/retained per op
+    python tools/microbench.py --baseline bench.json --threshold 0.2
+
+With --baseline, the run fails (exit status 1) when a benchmark got slower
+than the threshold allows. Run from the repository root.
+"""
+import argparse
+import asyncio
+import atexit
+import inspect
+import itertools
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.events import EventBuffer
+from backend.game_engine import GameEngine
+from backend.maps import MAP_SIZES, MapGenerator
+from backend.players import Player
+from backend.utils import calculate_sound_propagation, export_event_log, get_room_adjacency
+
+DEFAULTS = {
+    "players": [8, 64],
+    "events": [1000, 10000],
+    "map": ["default", "large"],
+    "format": ["json", "ndjson", "text"]
+}
+BENCHMARKS = {}  # name -> (setup function, parameter names)
+TEARDOWN = []  # Cleanups registered by the current benchmark's setup
+
+
+def benchmark(*params):
+    """Register a setup function; it gets the parameters by keyword and returns
+    the operation to time (a function, or a coroutine function)"""
+    def register(setup):
+        BENCHMARKS[setup.__name__.removeprefix("bench_")] = (setup, params)
+        return setup
+    return register
+
+
+class FakeWebSocket:
+    """Socket that accepts every frame immediately"""
+    async def send_text(self, data):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+    async def send_json(self, data):
+        pass
+
+
+def make_map(size):
+    if size == "default":
+        return MapGenerator().generate_default_map()
+    return MapGenerator().generate_ai_map(size, seed=1)
+
+
+def make_engine(map_size="default", players=0, events=1000):
+    """Engine with an event buffer of the given size and players spread over the rooms"""
+    engine = GameEngine(room_code="bench", flush_interval=0, map_obj=make_map(map_size))
+    engine.event_engine.max_events = events
+    engine.event_engine.events = EventBuffer(events)
+    room_names = list(engine.rooms)
+    for i in range(players):
+        player = Player(f"p{i}", FakeWebSocket(), engine.map)
+        engine._add_player(player)
+        player.set_room(room_names[i % len(room_names)])
+        engine.fanout.register(player.player_id, player.websocket)
+    return engine
+
+
+def fill_events(engine, count, seed=1):
+    """Add a realistic mix of chat, move, ability and AI events across the rooms"""
+    rng = random.Random(seed)
+    room_names = list(engine.rooms)
+    for i in range(count):
+        room = rng.choice(room_names)
+        kind = rng.random()
+        if kind < 0.4:
+            event = {"type": "chat", "player": f"p{i % 50}", "message": "hello there", "room": room}
+        elif kind < 0.6:
+            event = {"type": "player_moved", "player": f"p{i % 50}", "room": room, "visibility": "room"}
+        elif kind < 0.8:
+            event = {"type": "ability_used", "player": f"p{i % 50}", "ability": "Listen", "room": room,
+                     "visibility": "room"}
+        else:
+            event = {"type": "ai_event", "room": room, "text": "A floorboard creaks.", "volume": rng.randint(1, 3),
+                     "visibility": "room"}
+        engine.event_engine.add_event(event)
+
+
+@benchmark("events")
+def bench_add_event(events):
+    engine = make_engine(events=events)
+    fill_events(engine, events)  # Steady state: every add evicts the oldest event
+    add_event = engine.event_engine.add_event
+
+    def run():
+        add_event({"type": "chat", "player": "p1", "message": "hello", "room": "Library"})
+    return run
+
+
+@benchmark("events", "map")
+def bench_filter_events(events, map):
+    engine = make_engine(map, players=1, events=events)
+    fill_events(engine, events)
+    player = engine.players["p0"]
+    filter_events = engine.event_engine.filter_events_for_player
+    return lambda: filter_events(player, 0)  # Cursor at 0: the whole buffer is scanned
+
+
+@benchmark("players", "events")
+def bench_broadcast_room_events(players, events):
+    engine = make_engine(players=players, events=events)
+    fill_events(engine, events)
+    room_name = engine.players["p0"].get_room_name()
+    for player in engine.players.values():
+        player.set_room(room_name)  # Everyone in one room: the widest fan-out
+        player.last_seq = engine.event_engine.last_seq
+
+    async def run():
+        engine.event_engine.add_event({"type": "chat", "player": "p0", "message": "hello", "room": room_name})
+        await engine.broadcast_room_events(room_name)
+        await asyncio.sleep(0)  # Let the writers drain their queues
+    TEARDOWN.append(lambda: [engine.remove_player(p) for p in list(engine.players.values())])
+    return run
+
+
+def _room_pairs(graph, count=1024, seed=1):
+    rng = random.Random(seed)
+    return [(rng.choice(graph.names), rng.choice(graph.names)) for _ in range(count)]
+
+
+@benchmark("map")
+def bench_sound_propagation(map):
+    graph = make_map(map).graph
+    room_pairs = _room_pairs(graph)
+    for origin, _ in room_pairs:
+        graph.distance_row(graph.ids[origin])  # Warm the rows maps without a full table compute on demand
+    pairs = itertools.cycle(room_pairs)
+    return lambda: calculate_sound_propagation(*next(pairs), 3, graph)
+
+
+@benchmark("map")
+def bench_sound_propagation_bfs(map):
+    room_map = make_map(map)
+    adjacency = get_room_adjacency(room_map.rooms)
+    pairs = itertools.cycle(_room_pairs(room_map.graph))
+    return lambda: calculate_sound_propagation(*next(pairs), 3, adjacency)
+
+
+@benchmark("players", "map")
+def bench_move_to(players, map):
+    engine = make_engine(map, players=players)
+    player = engine.players["p0"]
+    here = player.get_room_name()
+    there = engine.rooms[here].connections[0].name
+    rooms = itertools.cycle((there, here))
+    return lambda: player.move_to(next(rooms))
+
+
+@benchmark("events", "format")
+def bench_export_event_log(events, format):
+    engine = make_engine(events=events)
+    fill_events(engine, events)
+    view = engine.event_engine.events.view()
+    return lambda: export_event_log(view, format)
+
+
+def _database(events):
+    from backend.db import Database
+    directory = tempfile.mkdtemp(prefix="isg-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    database = Database(db_path=directory)
+    engine = make_engine(events=events)
+    fill_events(engine, events)
+    return database, list(engine.event_engine.events.view())
+
+
+@benchmark("events")
+def bench_db_save_events(events):
+    database, event_list = _database(events)
+    return lambda: database.save_events(event_list, "bench")
+
+
+@benchmark("events")
+def bench_db_get_events(events):
+    database, event_list = _database(events)
+    database.save_events(event_list, "bench")
+    return lambda: database.get_events("bench")
+
+
+@benchmark()
+def bench_db_save_player():
+    database, _ = _database(0)
+    player = Player("p0", FakeWebSocket(), MapGenerator().generate_default_map()).to_dict()
+    return lambda: database.save_player(player)
+
+
+@benchmark()
+def bench_db_get_player():
+    database, _ = _database(0)
+    database.save_player(Player("p0", FakeWebSocket(), MapGenerator().generate_default_map()).to_dict())
+    return lambda: database.get_player("p0")
+
+
+async def _time_async(operation, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        await operation()
+    return time.perf_counter() - started
+
+
+def _time(operation, number):
+    if inspect.iscoroutinefunction(operation):
+        return asyncio.get_event_loop().run_until_complete(_time_async(operation, number))
+    started = time.perf_counter()
+    for _ in range(number):
+        operation()
+    return time.perf_counter() - started
+
+
+async def _run_cleanups():
+    while TEARDOWN:
+        TEARDOWN.pop()()
+
+
+def _teardown():
+    """Run the benchmark's cleanups (inside the loop) and wait for the tasks it left behind"""
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(_run_cleanups())
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+
+def _calls_for(operation, min_time):
+    """Calls per repeat so one repeat takes at least min_time (like timeit.autorange)"""
+    number = 1
+    while True:
+        if _time(operation, number) >= min_time or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def measure(operation, repeat, min_time):
+    _time(operation, 1)  # Warm up
+    number = _calls_for(operation, min_time)
+    times = [_time(operation, number) / number for _ in range(repeat)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": round(min(times) * 1e6, 3),
+        "median_us": round(statistics.median(times) * 1e6, 3),
+        "ops_per_s": round(1 / min(times), 1)
+    }
+
+
+def measure_memory(setup, params, number):
+    """Setup size, plus peak and retained allocations while running number calls"""
+    tracemalloc.start()
+    operation = setup(**params)
+    setup_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    _time(operation, number)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "number": number,
+        "setup_kib": round(setup_bytes / 1024, 1),
+        "peak_kib": round((peak - setup_bytes) / 1024, 1),
+        "retained_bytes_per_op": round((current - setup_bytes) / number, 1)
+    }
+
+
+def run(names, values, repeat, min_time, memory, number):
+    results = []
+    for name in names:
+        setup, params = BENCHMARKS[name]
+        for combination in itertools.product(*(values[p] for p in params)):
+            kwargs = dict(zip(params, combination))
+            if memory:
+                result = measure_memory(setup, kwargs, number)
+            else:
+                result = measure(setup(**kwargs), repeat, min_time)
+            _teardown()
+            results.append({"name": name, "params": kwargs, **result})
+            label = ", ".join(f"{k}={v}" for k, v in kwargs.items())
+            if memory:
+                summary = f"peak {result['peak_kib']:>10} KiB  retained {result['retained_bytes_per_op']:>10} B/op"
+            else:
+                summary = f"{result['best_us']:>12} us  {result['ops_per_s']:>14} ops/s"
+            print(f"{name:<28} {label:<40} {summary}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks slower than their baseline counterpart by more than threshold"""
+    previous = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if old and "best_us" in old and "best_us" in result and result["best_us"] > old["best_us"] * (1 + threshold):
+            regressions.append(f"{result['name']} {result['params']}: {result['best_us']}us > baseline {old['best_us']}us")
+    return regressions
+
+
+def parse_list(kind):
+    def parse(text):
+        items = [item.strip() for item in text.split(",") if item.strip()]
+        return [int(item) for item in items] if kind is int else items
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("benchmarks", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and their parameters")
+    parser.add_argument("--players", type=parse_list(int), default=DEFAULTS["players"], help="Player counts, e.g. 8,64")
+    parser.add_argument("--events", type=parse_list(int), default=DEFAULTS["events"], help="Event buffer sizes")
+    parser.add_argument("--map", type=parse_list(str), default=DEFAULTS["map"],
+                        help=f"Map sizes: default or {', '.join(MAP_SIZES)}")
+    parser.add_argument("--format", type=parse_list(str), default=DEFAULTS["format"], help="Export formats")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats (best is reported)")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per repeat")
+    parser.add_argument("--memory", action="store_true", help="Measure allocations with tracemalloc instead of time")
+    parser.add_argument("--number", type=int, default=1000, help="Calls per benchmark in --memory mode")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+    options = parser.parse_args()
+
+    if options.list:
+        for name, (_, params) in BENCHMARKS.items():
+            print(f"{name:<28} {', '.join(params) or '-'}")
+        return
+    unknown = [name for name in options.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)} (see --list)")
+    for size in options.map:
+        if size != "default" and size not in MAP_SIZES:
+            parser.error(f"unknown map size {size!r}")
+
+    values = {"players": options.players, "events": options.events, "map": options.map, "format": options.format}
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    results = run(options.benchmarks or list(BENCHMARKS), values, options.repeat, options.min_time,
+                  options.memory, options.number)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "mode": "memory" if options.memory else "time",
+        "results": results
+    }
+    print(json.dumps(report, indent=2))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = compare(results, json.load(f), options.threshold)
+        for regression in regressions:
+            print("REGRESSION:", regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()